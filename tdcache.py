@@ -0,0 +1,189 @@
+import hashlib
+import inspect
+from joblib import dump, hash as joblib_hash, load
+import json
+import os
+import pandas as pd
+from tddata import build_big_df, combined_dtypes, compact_dtypes, fits_float32, list_tickers, read_combined
+from tdschema import Schema
+import time
+
+def snapshot_hash(database_path, tables=None):
+    """
+    This function hashes the content of a scraped watchlist database, so any
+    rescraped or edited file changes the hash.
+    :param database_path: (str) The location of the database
+    :param tables: (list) tables to hash, such as ['combined'], every file if None
+    """
+    digest = hashlib.sha1()
+    for ticker in list_tickers(database_path):
+        ticker_path = os.path.join(database_path, ticker)
+        for name in sorted(os.listdir(ticker_path)):
+            if tables is not None and os.path.splitext(name)[0] not in tables:
+                continue
+            digest.update('{}/{}\x00'.format(ticker, name).encode())
+            with open(os.path.join(ticker_path, name), 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+def code_hash(*functions):
+    """
+    This function hashes the source code of functions, so cached artifacts are
+    invalidated when the code computing them changes.
+    :param functions: functions or classes the artifact depends on
+    """
+    sources = []
+    for function in functions:
+        try:
+            sources.append(inspect.getsource(function))
+        except (OSError, TypeError):
+            sources.append(getattr(getattr(function, '__code__', None), 'co_code', repr(function)))
+    return joblib_hash(sources)
+
+class ArtifactCache:
+    """
+    Disk cache of derived artifacts, such as combined dfs, feature matrices and
+    targets, addressed by a hash of the step name, its version and its inputs.
+    Inputs are content hashes or the keys of upstream artifacts, so a changed
+    input or step gives a new key and the stale artifact is never read again.
+    Artifacts are saved uncompressed with joblib and their arrays are memory
+    mapped on load, and the least recently used ones are evicted when the
+    cache grows past its quota.
+    :param path: (str) directory of the cache
+    :param quota_mb: (float) most disk space of the artifacts in MB
+    """
+    def __init__(self, path, quota_mb=2048):
+        self.path = path
+        self.quota_mb = quota_mb
+        self.hits = 0
+        self.misses = 0
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self.index = {}
+        if os.path.isfile(self._index_path):
+            with open(self._index_path) as f:
+                self.index = json.load(f)
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.path, 'index.json')
+
+    def _file(self, key):
+        return os.path.join(self.path, '{}.joblib'.format(key))
+
+    def _save_index(self):
+        with open(self._index_path + '.tmp', 'w') as f:
+            json.dump(self.index, f)
+        os.replace(self._index_path + '.tmp', self._index_path)
+
+    def key(self, step, inputs=(), version=1):
+        """
+        This function returns the key of an artifact.
+        :param step: (str) name of the step producing it, such as 'big_df'
+        :param inputs: (list) hashes, keys and parameters the step depends on
+        :param version: (int or str) version of the step, such as a code_hash()
+        """
+        return joblib_hash((step, version, list(inputs)))
+
+    def __contains__(self, key):
+        return key in self.index and os.path.isfile(self._file(key))
+
+    def get(self, key, mmap_mode='r'):
+        """
+        This function loads an artifact, marking it as recently used.
+        :param key: (str) key of the artifact
+        :param mmap_mode: (str) memory map mode of its arrays, read into memory if None
+        """
+        value = load(self._file(key), mmap_mode=mmap_mode)
+        self.index[key]['used'] = time.time()
+        self._save_index()
+        self.hits += 1
+        return value
+
+    def put(self, key, value, step=None):
+        """
+        This function saves an artifact, then evicts the least recently used
+        artifacts until the cache fits its quota.
+        :param key: (str) key of the artifact
+        :param value: artifact, such as a DataFrame or arrays
+        :param step: (str) name of the step, kept for report()
+        """
+        dump(value, self._file(key))
+        self.index[key] = {'step': step,
+                           'size': os.path.getsize(self._file(key)),
+                           'created': time.time(),
+                           'used': time.time()
+                          }
+        self.misses += 1
+        self.evict()
+
+    def evict(self, keep=None):
+        """
+        This function deletes least recently used artifacts until the cache
+        fits its quota. The newest artifact is kept even if it alone is over.
+        :param keep: (float) MB to shrink the cache to, the quota if None
+        """
+        limit = (self.quota_mb if keep is None else keep) * 1024**2
+        by_use = sorted(self.index, key=lambda key: self.index[key]['used'])
+        total = sum(entry['size'] for entry in self.index.values())
+        for key in by_use[:-1]:
+            if total <= limit:
+                break
+            total -= self.index[key]['size']
+            print("Evicting {} artifact {}".format(self.index[key]['step'], key))
+            if os.path.isfile(self._file(key)):
+                os.remove(self._file(key))
+            del self.index[key]
+        self._save_index()
+
+    def cached(self, step, inputs, compute, version=1, mmap_mode='r'):
+        """
+        This function returns an artifact from the cache, computing and saving
+        it on a miss. Returns the artifact and its key, which downstream steps
+        take as an input, as in:
+        big_df, big_key = cache.cached('big_df', [snapshot_hash(path)], lambda: build_big_df(...))
+        X, X_key = cache.cached('features', [big_key], lambda: builder.fit_transform(big_df))
+        :param step: (str) name of the step, such as 'features'
+        :param inputs: (list) hashes, keys and parameters the step depends on
+        :param compute: (function) computes the artifact without arguments
+        :param version: (int or str) version of the step, such as a code_hash()
+        :param mmap_mode: (str) memory map mode of its arrays, read into memory if None
+        """
+        key = self.key(step, inputs, version)
+        if key in self:
+            return self.get(key, mmap_mode), key
+        value = compute()
+        self.put(key, value, step)
+        return value, key
+
+    def report(self):
+        """
+        This function returns a dataframe of the number of artifacts and MB used
+        by each step.
+        """
+        entries = pd.DataFrame(list(self.index.values()), columns=['step', 'size', 'created', 'used'])
+        report = entries.groupby('step').agg(Artifacts=('size', 'size'), MB=('size', 'sum'))
+        report['MB'] = report['MB'] / 1024**2
+        report.index.name = None
+        return report
+
+def cached_big_df(cache, database_path, schema=None, compact=False):
+    """
+    This function returns the combined df of every ticker of a database, as
+    build_big_df() does, from the cache when neither the combined files nor
+    the loading code have changed. Returns the combined df and its key. A
+    cached df is read into memory rather than memory mapped, so it is writable
+    like a freshly built one.
+    :param cache: (ArtifactCache) cache of derived artifacts
+    :param database_path: (str) The location of the database
+    :param schema: (Schema) tdschema schema to assemble the columns with
+    :param compact: (bool) whether to store the columns in memory-compact dtypes
+    """
+    inputs = [snapshot_hash(database_path, tables=['combined']), compact,
+              None if schema is None else (schema.version, schema.dtypes, schema.synonyms)]
+    version = code_hash(build_big_df, read_combined, combined_dtypes, compact_dtypes, fits_float32,
+                        Schema)
+    return cache.cached('big_df', inputs,
+                        lambda: build_big_df(list_tickers(database_path), database_path,
+                                             compact=compact, schema=schema),
+                        version=version, mmap_mode=None)
@@ -0,0 +1,187 @@
+import numpy as np
+import pandas as pd
+from tddata import build_big_df
+from tdsnapshot import Snapshot
+
+CHANGE_COLUMNS = ['Kind', 'Ticker', 'Table', 'Field', 'Old', 'New']
+
+def stack_fields(df):
+    """
+    This function turns a dataframe indexed by ticker into a Series of its
+    non-missing values indexed by (ticker, field).
+    :param df: (DataFrame) values indexed by ticker, one column per field
+    """
+    stacked = df.astype(object).stack(dropna=True)
+    stacked.index.names = ['Ticker', 'Field']
+    return stacked
+
+def stack_tables(tables):
+    """
+    This function turns the per-ticker tables of a tab, such as
+    Snapshot.table('earnings_yearly'), into one Series of their non-missing
+    values indexed by (ticker, field), the field being '<row> | <column>'.
+    :param tables: (dict) dataframes by ticker
+    """
+    frames = []
+    for ticker, df in tables.items():
+        stacked = df.astype(object).stack(dropna=True)
+        fields = ['{} | {}'.format(row, col) for row, col in stacked.index]
+        frames.append(pd.Series(stacked.to_numpy(), index=pd.MultiIndex.from_product([[ticker], fields])))
+    if not frames:
+        return pd.Series(dtype=object, index=pd.MultiIndex.from_arrays([[], []]))
+    stacked = pd.concat(frames)
+    # Tables with repeated row names keep their first value, as the combined df does
+    stacked = stacked[~stacked.index.duplicated(keep='first')]
+    stacked.index.names = ['Ticker', 'Field']
+    return stacked
+
+def diff_stacked(old, new, table='combined', old_tickers=None, new_tickers=None):
+    """
+    This function compares two stacked snapshots with one outer join and
+    returns only the differing values. Values of tickers that are only in the
+    new snapshot are 'added' rows, values of tickers only in the old one are
+    'removed' rows, and the others are 'changed' rows. An added or removed
+    ticker without any value gets one row with no Field, so the feed still
+    records it.
+    :param old: (Series) previous values indexed by (ticker, field)
+    :param new: (Series) new values indexed by (ticker, field)
+    :param table: (str) table the values come from
+    :param old_tickers: (list-like) tickers of the previous snapshot, including
+                                    those without values, the tickers of old if None
+    :param new_tickers: (list-like) tickers of the new snapshot, including those
+                                    without values, the tickers of new if None
+    """
+    joined = pd.concat({'Old': old, 'New': new}, axis=1, join='outer')
+    old_values = joined['Old'].to_numpy()
+    new_values = joined['New'].to_numpy()
+    old_missing = pd.isnull(old_values)
+    new_missing = pd.isnull(new_values)
+    with np.errstate(invalid='ignore'):
+        differ = old_missing != new_missing
+        both = ~old_missing & ~new_missing
+        differ[both] = old_values[both] != new_values[both]
+    changes = joined[differ].reset_index()
+    changes.columns = ['Ticker', 'Field', 'Old', 'New']
+
+    old_tickers = pd.Index(old.index.get_level_values(0) if old_tickers is None else old_tickers).unique()
+    new_tickers = pd.Index(new.index.get_level_values(0) if new_tickers is None else new_tickers).unique()
+    # Tickers entering or leaving without a value still need a row
+    empty = old_tickers.difference(new_tickers).append(new_tickers.difference(old_tickers))
+    empty = empty.difference(pd.Index(changes['Ticker'].unique()))
+    if len(empty):
+        changes = pd.concat([changes, pd.DataFrame({'Ticker': empty, 'Field': np.NaN,
+                                                    'Old': np.NaN, 'New': np.NaN})],
+                            ignore_index=True)
+
+    kind = np.where(~changes['Ticker'].isin(old_tickers), 'added',
+                    np.where(~changes['Ticker'].isin(new_tickers), 'removed', 'changed'))
+    changes.insert(0, 'Kind', kind)
+    changes.insert(2, 'Table', table)
+    return changes[CHANGE_COLUMNS]
+
+def compact_changes(changes):
+    """
+    This function stores the repeated labels of a changefeed as categories.
+    :param changes: (DataFrame) changefeed
+    """
+    changes = changes.reset_index(drop=True)
+    for col in ['Kind', 'Ticker', 'Table', 'Field']:
+        changes[col] = changes[col].astype('category')
+    return changes
+
+def frame_changes(old, new, table='combined'):
+    """
+    This function returns the changefeed between two dataframes indexed by
+    ticker, such as the combined dfs of two snapshots.
+    :param old: (DataFrame) previous snapshot
+    :param new: (DataFrame) new snapshot
+    :param table: (str) name of the table
+    """
+    return compact_changes(diff_stacked(stack_fields(old), stack_fields(new), table,
+                                        old.index, new.index))
+
+def panel_changes(panel, old_date, new_date, columns=None):
+    """
+    This function returns the changefeed of the combined dfs of two snapshots
+    of a SnapshotPanel.
+    :param panel: (SnapshotPanel) panel holding both snapshots
+    :param old_date: (str or datetime) previous snapshot date
+    :param new_date: (str or datetime) new snapshot date
+    :param columns: (list) fields to compare, all if None
+    """
+    return frame_changes(panel.load_snapshot(old_date, columns), panel.load_snapshot(new_date, columns))
+
+def snapshot_changes(old, new, tables=('combined',), schema=None):
+    """
+    This function returns the changefeed between two scraped watchlist
+    databases, for the combined df and any per-tab tables, such as
+    'earnings_yearly' or 'valuation'. Fields of per-tab tables are named
+    '<row> | <column>'.
+    :param old: (str or Snapshot) previous database, or its Snapshot
+    :param new: (str or Snapshot) new database, or its Snapshot
+    :param tables: (list) tables to compare
+    :param schema: (Schema) assemble both combined dfs with this tdschema schema,
+                            which is several times faster than Snapshot.load_combined()
+    """
+    old = old if isinstance(old, Snapshot) else Snapshot(old)
+    new = new if isinstance(new, Snapshot) else Snapshot(new)
+    feeds = []
+    for table in tables:
+        if table == 'combined' and schema is not None:
+            old_df = build_big_df(old.tickers, old.database_path, schema=schema)
+            new_df = build_big_df(new.tickers, new.database_path, schema=schema)
+            feeds.append(diff_stacked(stack_fields(old_df), stack_fields(new_df), table,
+                                      old_df.index, new_df.index))
+        elif table == 'combined':
+            old_df = old.load_combined()
+            new_df = new.load_combined()
+            feeds.append(diff_stacked(stack_fields(old_df), stack_fields(new_df), table,
+                                      old_df.index, new_df.index))
+        else:
+            feeds.append(diff_stacked(stack_tables(old.table(table)), stack_tables(new.table(table)),
+                                      table, old.tickers, new.tickers))
+    return compact_changes(pd.concat(feeds, axis=0, ignore_index=True))
+
+def changed_tickers(changes, fields=None, table='combined'):
+    """
+    This function lists the tickers whose rows need to be recomputed: the added
+    tickers and those with a changed field. Removed tickers are left out.
+    :param changes: (DataFrame) changefeed
+    :param fields: (list) fields downstream depends on, such as the input columns
+                          of a ScoringPipeline, all if None
+    :param table: (str) table downstream reads
+    """
+    rows = (changes['Table'] == table) & (changes['Kind'] != 'removed')
+    if fields is not None:
+        rows &= changes['Field'].isin(fields)
+    return sorted(changes.loc[rows, 'Ticker'].unique())
+
+def removed_tickers(changes):
+    """
+    This function lists the tickers of the previous snapshot missing from the new one.
+    :param changes: (DataFrame) changefeed
+    """
+    return sorted(changes.loc[changes['Kind'] == 'removed', 'Ticker'].unique())
+
+def apply_changes(old, changes, table='combined'):
+    """
+    This function updates a previous dataframe with a changefeed, giving the
+    new snapshot's dataframe without reading it, as a downstream consumer of
+    the feed would.
+    :param old: (DataFrame) previous snapshot, indexed by ticker
+    :param changes: (DataFrame) changefeed from the previous to the new snapshot
+    :param table: (str) table of the feed to apply
+    """
+    changes = changes[changes['Table'] == table]
+    removed = removed_tickers(changes)
+    added = pd.Index(changes.loc[changes['Kind'] == 'added', 'Ticker'].unique().astype(object))
+    new = old.drop(index=removed)
+    new = new.reindex(new.index.append(added.difference(new.index, sort=False)))
+    updates = changes[changes['Kind'] != 'removed']
+    for field, rows in updates.groupby('Field', observed=True):
+        if field not in new.columns:
+            new[field] = np.NaN
+        # Back from the feed's objects to floats or datetimes
+        values = pd.Series(rows['New'].to_numpy(), dtype=object).infer_objects().to_numpy()
+        new.loc[rows['Ticker'].astype(object).to_numpy(), field] = values
+    return new
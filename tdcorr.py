@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+def standardize(values):
+    """
+    This function centers and scales the columns of a matrix, ignoring NaN, so
+    correlations can be summed in float32 without losing precision to large
+    values such as market caps. Returns a float32 matrix with NaN kept.
+    :param values: (array) samples x features matrix
+    """
+    values = np.asarray(values, dtype='float64')
+    values = np.where(np.isfinite(values), values, np.NaN)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nanmean(values, axis=0)
+        std = np.nanstd(values, axis=0)
+    std[~(std > 0)] = 1.0
+    return ((values - mean) / std).astype('float32')
+
+def block_corr(A, B, min_periods=1):
+    """
+    This function returns the correlations between the columns of two float32
+    blocks, each over the rows where both columns have values, as pandas'
+    DataFrame.corr() does. Returns the correlations and the pair counts.
+    :param A: (array) samples x p block, NaN for missing values
+    :param B: (array) samples x q block, NaN for missing values
+    :param min_periods: (int) fewest rows a pair needs to get a correlation
+    """
+    mask_a = (~np.isnan(A)).astype('float32')
+    mask_b = (~np.isnan(B)).astype('float32')
+    a = np.where(mask_a > 0, A, 0).astype('float32')
+    b = np.where(mask_b > 0, B, 0).astype('float32')
+
+    count = mask_a.T @ mask_b
+    sum_a = a.T @ mask_b
+    sum_b = mask_a.T @ b
+    sum_ab = a.T @ b
+    sum_aa = (a * a).T @ mask_b
+    sum_bb = mask_a.T @ (b * b)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sum_ab - sum_a * sum_b / count
+        var_a = sum_aa - sum_a * sum_a / count
+        var_b = sum_bb - sum_b * sum_b / count
+        corr = cov / np.sqrt(var_a * var_b)
+    corr = np.clip(corr, -1, 1)
+    corr[count < max(min_periods, 2)] = np.NaN
+    return corr, count
+
+def correlated_pairs(X, threshold=0.9, block_size=512, min_periods=1):
+    """
+    This function finds the pairs of features whose absolute correlation is at
+    least the threshold. Correlations are computed block by block in float32,
+    so only block_size x block_size of the correlation matrix is ever in memory.
+    Returns a dataframe with 'Feature A', 'Feature B', 'Correlation' and 'Count'.
+    :param X: (DataFrame) samples x features, such as stacked snapshots
+    :param threshold: (float) smallest absolute correlation to report
+    :param block_size: (int) number of features per block
+    :param min_periods: (int) fewest rows a pair needs to get a correlation
+    """
+    values = standardize(X.to_numpy(dtype='float64'))
+    columns = np.asarray(X.columns, dtype=object)
+    n_features = values.shape[1]
+    frames = []
+    for start_a in range(0, n_features, block_size):
+        A = values[:, start_a:start_a + block_size]
+        for start_b in range(start_a, n_features, block_size):
+            B = values[:, start_b:start_b + block_size]
+            corr, count = block_corr(A, B, min_periods)
+            with np.errstate(invalid='ignore'):
+                hits = np.abs(corr) >= threshold
+            if start_a == start_b:
+                hits = np.triu(hits, k=1)
+            i, j = np.nonzero(hits)
+            frames.append(pd.DataFrame({'Feature A': columns[start_a + i],
+                                        'Feature B': columns[start_b + j],
+                                        'Correlation': corr[i, j],
+                                        'Count': count[i, j].astype(int)
+                                       }))
+    if not frames:
+        return pd.DataFrame(columns=['Feature A', 'Feature B', 'Correlation', 'Count'])
+    return pd.concat(frames, axis=0, ignore_index=True)
+
+def prune_correlated(X, threshold=0.9, keep='coverage', block_size=512, min_periods=1):
+    """
+    This function groups highly correlated features and keeps one feature per
+    group. Features are visited from the best to the worst by the keep
+    criterion, ties broken by name, and each one is kept unless it is
+    correlated with a feature already kept, in which case it joins that
+    feature's cluster. Returns the kept features and a dataframe of each
+    feature's cluster.
+    :param X: (DataFrame) samples x features, such as stacked snapshots
+    :param threshold: (float) smallest absolute correlation to group features
+    :param keep: (str) 'coverage' to keep the feature with the most values, or
+                       'variance' to keep the one with the largest variance
+    :param block_size: (int) number of features per correlation block
+    :param min_periods: (int) fewest rows a pair needs to get a correlation
+    """
+    if keep == 'coverage':
+        score = X.notnull().sum()
+    elif keep == 'variance':
+        score = X.replace([np.inf, -np.inf], np.NaN).var()
+    else:
+        raise ValueError("keep must be 'coverage' or 'variance'")
+    pairs = correlated_pairs(X, threshold, block_size, min_periods)
+
+    neighbours = {}
+    for a, b, corr in zip(pairs['Feature A'], pairs['Feature B'], pairs['Correlation']):
+        neighbours.setdefault(a, {})[b] = corr
+        neighbours.setdefault(b, {})[a] = corr
+
+    order = pd.DataFrame({'Feature': X.columns, 'Score': score.fillna(-np.inf).to_numpy()})
+    order = order.sort_values(['Score', 'Feature'], ascending=[False, True], kind='mergesort')
+    kept = []
+    clusters = {}
+    for feature in order['Feature']:
+        linked = [x for x in kept if x in neighbours.get(feature, {})]
+        if linked:
+            # Join the cluster of the best kept feature it is correlated with
+            clusters[feature] = (linked[0], neighbours[feature][linked[0]])
+        else:
+            kept.append(feature)
+            clusters[feature] = (feature, 1.0)
+
+    report = pd.DataFrame([[feature, cluster, corr, feature == cluster]
+                           for feature, (cluster, corr) in clusters.items()],
+                          columns=['Feature', 'Cluster', 'Correlation', 'Kept'])
+    kept = [col for col in X.columns if col in set(kept)]
+    return kept, report
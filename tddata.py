@@ -0,0 +1,132 @@
+from datetime import datetime
+import numpy as np
+import os
+import pandas as pd
+
+def snapshot_date(database_path):
+    """
+    This function returns the date of a watchlist database from its directory
+    name, which scrape_watchlist() makes as <name>_<mm-dd-YYYY>.
+    :param database_path: (str) The location of the database
+    """
+    name = os.path.basename(os.path.normpath(database_path))
+    return datetime.strptime(name.rsplit('_', 1)[-1], '%m-%d-%Y')
+
+def list_tickers(database_path):
+    """
+    This function lists the tickers of a previously scraped watchlist database
+    from its ticker directories.
+    :param database_path: (str) The location of the database
+    """
+    return sorted(name for name in os.listdir(database_path)
+                  if os.path.isdir(os.path.join(database_path, name)))
+
+def read_combined(ticker, database_path):
+    """
+    This function reads the 'combined.csv' file of one ticker of a previously
+    scraped watchlist database as a one row dataframe.
+    :param ticker: (str) ticker symbol
+    :param database_path: (str) The location of the database
+    """
+    file_path = database_path+'/{}/combined.csv'.format(ticker)
+    try:
+        temp = pd.read_csv(file_path, index_col='Unnamed: 0').T
+    except:
+        temp = pd.DataFrame(pd.read_csv(file_path)).T
+    return temp.astype('float64',errors='ignore')
+
+def combined_dtypes(big_df):
+    """
+    This function converts the columns of concatenated 'combined.csv' rows to
+    float where possible, and the analyst 'since' columns to datetimes.
+    :param big_df: (DataFrame) concatenated rows of read_combined()
+    """
+    new_df = pd.DataFrame()
+    for col in big_df:
+        new_df[col] = big_df[col].astype('float64', copy=True, errors='ignore')
+    for col in new_df.columns:
+        if col.endswith('since'):
+            new_df[col] = pd.to_datetime(new_df[col], infer_datetime_format=True)
+    return new_df
+
+def build_big_df(tickers, database_path, compact=False, schema=None):
+    """
+    This function reads a previously scraped watchlist database at the provided
+    path, and combines all of the 'combined.csv' files into one dataframe.
+    :param tickers: (list-like) The securities to be gathered
+    :param database_path: (str) The location of the database
+    :param compact: (bool) whether to store the columns in memory-compact dtypes,
+                           see compact_dtypes()
+    :param schema: (Schema) assemble the columns of this tdschema schema in one
+                            pass, with synonyms merged and drift reported, instead
+                            of the sorted union of every ticker's fields
+    """
+    if schema is not None:
+        new_df = schema.assemble([(ticker, read_combined(ticker, database_path)) for ticker in tickers])
+        if compact:
+            new_df = compact_dtypes(new_df)
+        return new_df
+    big_df = pd.DataFrame()
+    for ticker in tickers:
+        big_df = pd.concat([big_df, read_combined(ticker, database_path)], axis=0, sort=True)
+    new_df = combined_dtypes(big_df)
+    if compact:
+        new_df = compact_dtypes(new_df)
+    
+    return new_df
+
+def fits_float32(values, digits=7):
+    """
+    This function checks whether float values survive a float32 round trip,
+    meaning every finite value has at most the given number of significant
+    digits and is read back the same at that many digits.
+    :param values: (array-like) float values
+    :param digits: (int) significant digits to preserve, at most 7
+    """
+    values = np.asarray(values, dtype='float64')
+    values = values[np.isfinite(values) & (values != 0)]
+    if len(values) == 0:
+        return True
+    if np.abs(values).max() > np.finfo('float32').max:
+        return False
+    def round_sig(x):
+        scale = 10.0 ** (digits - 1 - np.floor(np.log10(np.abs(x))))
+        return np.round(x * scale) / scale
+    down = values.astype('float32').astype('float64')
+    return (np.allclose(round_sig(values), values, rtol=1e-12, atol=0) and
+            np.allclose(round_sig(down), values, rtol=1e-12, atol=0))
+
+def compact_dtypes(df, digits=7, category_ratio=0.5, sparse_threshold=0.6, verbose=True):
+    """
+    This function stores the columns of a combined df in memory-compact dtypes:
+    float columns become float32 where fits_float32() allows, string columns
+    with repeated values become categoricals (missing values are code -1), and
+    float columns with mostly NaN become sparse. Datetime columns are kept.
+    The memory before and after is printed.
+    :param df: (DataFrame) dataframe as returned by build_big_df()
+    :param digits: (int) significant digits float32 columns must preserve
+    :param category_ratio: (float) largest ratio of unique values to non-null
+                                   values for a string column to be categorical
+    :param sparse_threshold: (float) smallest fraction of NaN for a float column
+                                     to be sparse, None to never use sparse
+    :param verbose: (bool) whether to print the memory report
+    """
+    before = df.memory_usage(deep=True).sum()
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if series.dtype == 'float64':
+            if fits_float32(series.to_numpy(), digits):
+                series = series.astype('float32')
+            if sparse_threshold is not None and series.isnull().mean() >= sparse_threshold:
+                series = series.astype(pd.SparseDtype(series.dtype, np.NaN))
+        elif series.dtype == object:
+            n_values = series.count()
+            if n_values and series.nunique() <= category_ratio * n_values:
+                series = series.astype('category')
+        columns[col] = series
+    new_df = pd.DataFrame(columns, index=df.index)
+    after = new_df.memory_usage(deep=True).sum()
+    if verbose:
+        print('Memory: {:.2f} MB -> {:.2f} MB ({:.0%})'.format(before / 1e6, after / 1e6, after / before))
+    return new_df
\ No newline at end of file
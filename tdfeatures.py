@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+import pickle
+
+# Features with too many NaN, and duplicated, mundane ones
+TO_DROP = ['% Above Low', '% Below High', 'Annual Dividend $', 'Annual Dividend %',
+           'Ask close', 'Bid close', 'Change Since Close', 'Dividend Pay Date',
+           'Ex-dividend', 'Ex-dividend Date', 'Last (time)', 'Last Trade',
+           'Next Earnings Announcement', 'Price', 'cfra', 'cfra since',
+           'marketEdge', 'marketEdge opinion', 'marketEdge opinion since',
+           'marketEdge since', 'newConstructs', 'newConstructs since',
+           'researchTeam', 'researchTeam since', 'theStreet', 'theStreet since',
+           'ford', 'ford since', 'P/E Ratio (TTM, GAAP)', 'B/A Size',
+           'Volume Past Day', 'PEG Ratio (TTM, GAAP)']
+
+# Range columns split into low and high features
+RANGE_COLUMNS = {'52-Wk Range': ['52-Wk Low', '52-Wk High']}
+
+# Columns with M/B/T suffixed values
+SUFFIX_COLUMNS = ['Market Cap']
+SUFFIXES = {'M': 1e6, 'B': 1e9, 'T': 1e12}
+
+def split_range(series):
+    """
+    This function splits range strings such as "['112.52 - 162.62']" into low
+    and high floats. Returns a dataframe with 'Low' and 'High' columns.
+    :param series: (Series) range strings
+    """
+    cleaned = (series.astype(str).str.strip("[]'")
+                     .str.replace(' ', '', regex=False)
+                     .str.replace(',', '', regex=False))
+    parts = cleaned.str.split('-', n=2, expand=True).reindex(columns=[0, 1])
+    parts[series.isnull()] = np.NaN
+    parts = parts.astype('float64')
+    parts.columns = ['Low', 'High']
+    return parts
+
+def suffix_to_float(series):
+    """
+    This function converts strings with a M, B or T suffix, such as '46.5B',
+    into floats. Missing values stay NaN.
+    :param series: (Series) suffixed strings
+    """
+    values = series.astype(str)
+    multiplier = values.str[-1].map(SUFFIXES)
+    invalid = multiplier.isnull() & series.notnull()
+    if invalid.any():
+        raise ValueError("Invalid input: {}".format(list(series[invalid].unique()[:5])))
+    return values.str[:-1].where(series.notnull()).astype('float64') * multiplier
+
+class FeatureBuilder:
+    """
+    Turns the combined df of build_big_df() into a numeric model matrix. Fitting
+    fixes the output columns and the categories of each string feature, so any
+    later snapshot is transformed into exactly the training columns: unseen
+    categories give all-zero dummies and missing features are NaN.
+    :param to_drop: (list) columns dropped before building the features
+    :param drop_first: (bool) drop the first category of each dummy encoded feature
+    """
+    def __init__(self, to_drop=TO_DROP, drop_first=True):
+        self.to_drop = list(to_drop)
+        self.drop_first = drop_first
+        self.vocabularies = None
+        self.columns = None
+
+    def _prepare(self, big_df):
+        """
+        This function drops the unused columns and parses the range and suffixed
+        columns, leaving numeric and categorical columns.
+        """
+        X = big_df.drop(columns=self.to_drop, errors='ignore')
+        for col, (low, high) in RANGE_COLUMNS.items():
+            if col in X.columns:
+                parts = split_range(X.pop(col))
+                X[low] = parts['Low']
+                X[high] = parts['High']
+        for col in SUFFIX_COLUMNS:
+            if col in X.columns:
+                X[col] = suffix_to_float(X[col])
+        return X
+
+    def fit(self, big_df):
+        """
+        This function learns the output columns and the category vocabularies.
+        :param big_df: (DataFrame) training combined df
+        """
+        X = self._prepare(big_df)
+        categorical = [col for col in X.columns if X[col].dtype in [object, 'category']]
+        self.vocabularies = {col: sorted(X[col].dropna().unique()) for col in categorical}
+        self.columns = None
+        self.columns = list(self._encode(X).columns)
+        return self
+
+    def _encode(self, X):
+        """
+        This function dummy encodes the categorical columns with the fitted
+        vocabularies, after the numeric columns.
+        """
+        numeric = X.drop(columns=list(self.vocabularies), errors='ignore')
+        numeric = numeric.apply(pd.to_numeric, errors='coerce')
+        dummies = []
+        for col, categories in self.vocabularies.items():
+            values = X[col] if col in X.columns else pd.Series(np.NaN, index=X.index)
+            codes = pd.Categorical(values, categories=categories)
+            dummies.append(pd.get_dummies(codes, prefix=col, drop_first=self.drop_first).set_index(X.index))
+        return pd.concat([numeric] + dummies, axis=1)
+
+    def transform(self, big_df):
+        """
+        This function builds the model matrix of a combined df, with the fitted
+        columns in the fitted order and inf replaced by NaN.
+        :param big_df: (DataFrame) combined df
+        """
+        if self.columns is None:
+            raise ValueError("FeatureBuilder must be fitted before transform")
+        X = self._encode(self._prepare(big_df))
+        missing = [col for col in self.columns if col not in X.columns]
+        extra = [col for col in X.columns if col not in self.columns]
+        if missing:
+            print("Missing features filled with NaN:", missing)
+        if extra:
+            print("Features not seen in fit dropped:", extra)
+        X = X.reindex(columns=self.columns)
+        return X.replace([np.inf, -np.inf], np.NaN)
+
+    def fit_transform(self, big_df):
+        """
+        This function fits the builder and returns the training model matrix.
+        :param big_df: (DataFrame) training combined df
+        """
+        return self.fit(big_df).transform(big_df)
+
+    def save(self, path):
+        """
+        This function saves the fitted builder to a pickle file.
+        :param path: (str) file to save the builder to
+        """
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @classmethod
+    def load(cls, path):
+        """
+        This function loads a builder saved with save().
+        :param path: (str) file the builder was saved to
+        """
+        with open(path, 'rb') as f:
+            return pickle.load(f)
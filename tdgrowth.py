@@ -0,0 +1,261 @@
+import numpy as np
+import os
+import pandas as pd
+
+# Summary features derived from earnings_yearly by scrape_earnings()
+EARNINGS_FEATURES = ['Growth 1yr Low Est',
+                     'Growth 1yr High Est',
+                     'Growth 1yr Consensus Est',
+                     'Growth 2yr Low Est',
+                     'Growth 2yr High Est',
+                     'Growth 2yr Consensus Est',
+                     'Growth 5yr Low Est',
+                     'Growth 5yr High Est',
+                     'Growth 5yr Consensus Est',
+                     'Growth 5yr Actual/Est',
+                     'Growth 3yr Historic'
+                    ]
+
+# Rows added to fundies_yearly by scrape_fundamentals()
+FCF_ROWS = ['Free Cash Flow', 'FCF Growth']
+
+def load_earnings_yearly(tickers, database_path):
+    """
+    This function reads the 'earnings_yearly.csv' files of a previously scraped
+    watchlist database into one long dataframe, with a 'Ticker' and 'Period'
+    column added and the rows of each ticker kept in their original order.
+    :param tickers: (list-like) The securities to be gathered
+    :param database_path: (str) The location of the database
+    """
+    frames = []
+    for ticker in tickers:
+        file_path = database_path+'/{}/earnings_yearly.csv'.format(ticker)
+        if not os.path.isfile(file_path):
+            continue
+        temp = pd.read_csv(file_path, index_col=0)
+        if temp.empty:
+            continue
+        temp.index.name = 'Period'
+        temp = temp.reset_index()
+        temp.insert(0, 'Ticker', ticker)
+        frames.append(temp)
+    if not frames:
+        return pd.DataFrame(columns=['Ticker', 'Period'])
+    return pd.concat(frames, axis=0, ignore_index=True, sort=False)
+
+def load_fundies_yearly(tickers, database_path):
+    """
+    This function reads the 'fundies_yearly.csv' files of a previously scraped
+    watchlist database into one long dataframe with the columns 'Ticker',
+    'Report', 'Line Item', 'Period', 'Period Order' and 'Value'. Every period of
+    every row is kept, empty or not, and values that are not numeric (such as
+    the 'Date' rows) are NaN.
+    :param tickers: (list-like) The securities to be gathered
+    :param database_path: (str) The location of the database
+    """
+    frames = []
+    for ticker in tickers:
+        file_path = database_path+'/{}/fundies_yearly.csv'.format(ticker)
+        if not os.path.isfile(file_path):
+            continue
+        temp = pd.read_csv(file_path, index_col=0)
+        if 'Report' in temp.columns:
+            report = temp.pop('Report')
+        else:
+            report = pd.Series(np.NaN, index=temp.index)
+        periods = list(temp.columns)
+        if not periods:
+            continue
+        n_rows, n_periods = temp.shape
+        values = temp.apply(pd.to_numeric, errors='coerce').to_numpy(dtype='float64')
+        # Period-major order, so the periods of a row keep their column order
+        frames.append(pd.DataFrame({'Ticker': ticker,
+                                    'Report': np.tile(report.to_numpy(dtype=object), n_periods),
+                                    'Line Item': np.tile(temp.index.to_numpy(dtype=object), n_periods),
+                                    'Period': np.repeat(periods, n_rows),
+                                    'Period Order': np.repeat(np.arange(n_periods), n_rows),
+                                    'Value': values.T.ravel()
+                                   }))
+    if not frames:
+        return pd.DataFrame(columns=['Ticker', 'Report', 'Line Item', 'Period', 'Period Order', 'Value'])
+    long = pd.concat(frames, axis=0, ignore_index=True)
+    for col in ['Ticker', 'Report', 'Line Item', 'Period']:
+        long[col] = long[col].astype('category')
+    return long
+
+def grouped_pct_change(values, groups):
+    """
+    This function reproduces pandas' Series.pct_change() (with its default
+    forward fill of missing values) within each group, for all groups at once.
+    :param values: (Series) values in the order the changes are taken
+    :param groups: (Series) group label of each value
+    """
+    filled = values.groupby(groups, sort=False).ffill()
+    return filled / filled.groupby(groups, sort=False).shift() - 1
+
+def grouped_mean(values, groups):
+    """
+    This function takes the mean of the values of each group, skipping NaN like
+    Series.mean(). Infinite values are kept as Series.mean() does, which the
+    compensated sums of groupby().mean() do not.
+    :param values: (Series) values to average
+    :param groups: (Series) group label of each value
+    """
+    codes, uniques = pd.factorize(groups, sort=False)
+    x = values.to_numpy(dtype='float64')
+    present = ~np.isnan(x)
+    sums = np.bincount(codes[present], weights=x[present], minlength=len(uniques))
+    counts = np.bincount(codes[present], minlength=len(uniques))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+    return pd.Series(means, index=pd.Index(uniques, name=values.index.name))
+
+def earnings_growth(earnings_yearly):
+    """
+    This function computes the derived columns of earnings_yearly and the growth
+    features of scrape_earnings() for every ticker at once from long format data
+    (see load_earnings_yearly()). Either the raw 'Estimate range' column or the
+    'Low Estimate' and 'High Estimate' columns must be present. Returns the
+    growth features indexed by ticker, and the long data with derived columns.
+    :param earnings_yearly: (DataFrame) long format yearly earnings, with the
+                                        rows of each ticker in period order
+    """
+    yearly = earnings_yearly.copy()
+    groups = yearly['Ticker']
+    for col in ['Actual', 'Estimate']:
+        if col not in yearly.columns:
+            yearly[col] = np.NaN
+        yearly[col] = pd.to_numeric(yearly[col], errors='coerce')
+
+    # Parse the estimate range as scraped, or use the parsed columns
+    if 'Estimate range' in yearly.columns:
+        parts = yearly['Estimate range'].str.split()
+        yearly['Low Estimate'] = pd.to_numeric(parts.str[0].str.replace('$', '', regex=False))
+        yearly['High Estimate'] = pd.to_numeric(parts.str[2].str.replace('$', '', regex=False))
+    yearly['Growth'] = grouped_pct_change(yearly['Actual'], groups)
+    yearly['Low Growth Est'] = grouped_pct_change(yearly['Low Estimate'], groups)
+    yearly['High Growth Est'] = grouped_pct_change(yearly['High Estimate'], groups)
+
+    # Consensus is the estimate where given, the middle of the range otherwise,
+    # and the scraped 'Consensus estimate' where neither is available
+    consensus = (yearly['High Estimate'] + yearly['Low Estimate']) / 2
+    if 'Consensus estimate' in yearly.columns:
+        given = yearly['Consensus estimate'].astype(str).str.replace('$', '', regex=False)
+        consensus = consensus.fillna(pd.to_numeric(given, errors='coerce'))
+        yearly = yearly.drop(columns=['Consensus estimate'])
+    elif 'Consensus Estimate' in yearly.columns:
+        consensus = consensus.fillna(yearly['Consensus Estimate'])
+    has_estimate = yearly['Estimate'].notnull()
+    yearly['Consensus Estimate'] = consensus.where(~has_estimate, yearly['Estimate'])
+    yearly['Actual/Estimate'] = yearly['Actual'].where(~has_estimate, yearly['Estimate'])
+    yearly['A/E Growth'] = grouped_pct_change(yearly['Actual/Estimate'], groups)
+    yearly['Consensus Growth Est'] = (yearly['High Growth Est'] + yearly['Low Growth Est']) / 2
+    yearly = yearly.drop(columns=['Estimate range'], errors='ignore')
+
+    # Summary features per ticker, counting rows from the last year back
+    from_last = yearly.groupby('Ticker', sort=False).cumcount(ascending=False)
+    second_last = yearly[from_last == 1].set_index('Ticker')
+    last_two = yearly[from_last <= 1]
+    features = pd.DataFrame(index=pd.Index(groups.unique()))
+    features['Growth 1yr Low Est'] = second_last['Low Growth Est']
+    features['Growth 1yr High Est'] = second_last['High Growth Est']
+    features['Growth 1yr Consensus Est'] = second_last['Consensus Growth Est']
+    features['Growth 2yr Low Est'] = grouped_mean(last_two['Low Growth Est'], last_two['Ticker'])
+    features['Growth 2yr High Est'] = grouped_mean(last_two['High Growth Est'], last_two['Ticker'])
+    features['Growth 2yr Consensus Est'] = (features['Growth 2yr Low Est'] + features['Growth 2yr High Est']) / 2
+    features['Growth 5yr Low Est'] = grouped_mean(yearly['Low Growth Est'], groups)
+    features['Growth 5yr High Est'] = grouped_mean(yearly['High Growth Est'], groups)
+    features['Growth 5yr Consensus Est'] = grouped_mean(yearly['Consensus Growth Est'], groups)
+    features['Growth 5yr Actual/Est'] = grouped_mean(yearly['A/E Growth'], groups)
+    features['Growth 3yr Historic'] = grouped_mean(yearly['Growth'], groups)
+    # scrape_earnings() fails without a second to last year
+    features.loc[~features.index.isin(second_last.index), :] = np.NaN
+    features.index.name = None
+
+    return features, yearly
+
+def fcf_growth(fundies_yearly):
+    """
+    This function computes 'Free Cash Flow', 'FCF Growth' and the 'FCF Growth 5yr'
+    feature of scrape_fundamentals() for every ticker at once from long format
+    data (see load_fundies_yearly()). Any 'Free Cash Flow' and 'FCF Growth' rows
+    already present are ignored. Returns the feature indexed by ticker, and the
+    long format rows of the two derived line items.
+    :param fundies_yearly: (DataFrame) long format yearly fundamentals
+    """
+    long = fundies_yearly[~fundies_yearly['Line Item'].isin(FCF_ROWS)]
+    tickers = pd.Index(np.asarray(long['Ticker'].unique(), dtype=object))
+    periods = long.groupby('Ticker', sort=False, observed=True)['Period Order'].max().reindex(tickers) + 1
+    n_periods = int(periods.max()) if len(periods) else 0
+
+    # Tickers where either item is missing or repeated get no FCF, as when scraped
+    items = long[long['Line Item'].isin(['Total Cash from Operations', 'Capital Expenditures'])]
+    counts = items.groupby(['Ticker', 'Line Item'], sort=False, observed=True)['Period'].count()
+    counts = counts.unstack().reindex(index=tickers, columns=['Total Cash from Operations', 'Capital Expenditures'])
+    valid = (counts == periods.to_numpy()[:, None]).all(axis=1).to_numpy()
+
+    # Ticker x period grids of both items
+    rows = tickers.get_indexer(items['Ticker'])
+    cols = items['Period Order'].to_numpy(dtype=int)
+    grids = {}
+    for item in ['Total Cash from Operations', 'Capital Expenditures']:
+        grid = np.full((len(tickers), n_periods), np.NaN)
+        mask = (items['Line Item'] == item).to_numpy()
+        grid[rows[mask], cols[mask]] = items['Value'].to_numpy(dtype='float64')[mask]
+        grids[item] = grid
+    fcf = grids['Total Cash from Operations'] + grids['Capital Expenditures']
+    fcf[~valid] = np.NaN
+
+    # pct_change with forward fill across the periods of each ticker
+    in_range = np.arange(n_periods)[None, :] < periods.to_numpy()[:, None]
+    filled = pd.DataFrame(fcf).ffill(axis=1).to_numpy()
+    growth = np.full(fcf.shape, np.NaN)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth[:, 1:] = filled[:, 1:] / filled[:, :-1] - 1
+    growth[~in_range] = np.NaN
+
+    # Series.mean() of each ticker's column, which has a trailing 'Report' row.
+    # Rows are summed over their own length so the summation order matches
+    lengths = periods.to_numpy(dtype=int) + 1
+    padded = np.zeros((len(tickers), n_periods + 1))
+    padded[:, :n_periods] = np.where(np.isnan(growth), 0, growth)
+    sums = np.zeros(len(tickers))
+    for length in np.unique(lengths):
+        rows = lengths == length
+        sums[rows] = padded[rows, :length].sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / (~np.isnan(growth)).sum(axis=1)
+    features = pd.DataFrame({'FCF Growth 5yr': means}, index=tickers)
+    features.loc[~valid, 'FCF Growth 5yr'] = np.NaN
+    features.index.name = None
+
+    # Long format rows for the derived line items
+    period_names = long.drop_duplicates(['Ticker', 'Period Order']).set_index(['Ticker', 'Period Order'])['Period']
+    ticker_idx, order_idx = np.nonzero(in_range)
+    derived = []
+    for item, grid in zip(FCF_ROWS, [fcf, growth]):
+        derived.append(pd.DataFrame({'Ticker': tickers[ticker_idx],
+                                     'Report': np.NaN,
+                                     'Line Item': item,
+                                     'Period Order': order_idx,
+                                     'Value': grid[ticker_idx, order_idx]
+                                    }))
+    derived = pd.concat(derived, axis=0, ignore_index=True)
+    derived['Period'] = period_names.reindex(pd.MultiIndex.from_arrays([derived['Ticker'], derived['Period Order']])).to_numpy()
+    derived = derived[['Ticker', 'Report', 'Line Item', 'Period', 'Period Order', 'Value']]
+
+    return features, derived
+
+def growth_features(tickers, database_path):
+    """
+    This function recomputes the growth features of scrape_earnings() and
+    scrape_fundamentals() for every ticker of a previously scraped watchlist
+    database from its yearly tables, so formulas can change without scraping
+    again. Returns a dataframe indexed by ticker.
+    :param tickers: (list-like) The securities to be gathered
+    :param database_path: (str) The location of the database
+    """
+    earnings, _ = earnings_growth(load_earnings_yearly(tickers, database_path))
+    fcf, _ = fcf_growth(load_fundies_yearly(tickers, database_path))
+    features = pd.concat([earnings, fcf], axis=1, sort=False)
+    return features.reindex([ticker for ticker in tickers if ticker in features.index])
@@ -0,0 +1,234 @@
+from joblib import Parallel, delayed, dump, hash as joblib_hash, load
+import numpy as np
+import os
+import pandas as pd
+from sklearn.base import clone, is_classifier
+from sklearn.experimental import enable_iterative_imputer
+from sklearn.impute import SimpleImputer, KNNImputer, IterativeImputer
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import check_cv
+from sklearn.preprocessing import StandardScaler
+import time
+
+N_SPLITS = 5 # Fold numbers for cv scoring
+
+def estimator_name(estimator):
+    """
+    This function returns the class name of an estimator, as used for labels.
+    :param estimator: (estimator) scikit-learn estimator
+    """
+    return str(estimator).split('(')[0]
+
+def default_imputers(iterative_estimators=None, max_iter=10):
+    """
+    This function returns the imputers compared in the modeling notebook, by
+    label: zero, mean, KNN and iterative imputation, and iterative imputation
+    with each of the given estimators.
+    :param iterative_estimators: (list) estimators for IterativeImputer
+    :param max_iter: (int) max_iter of the IterativeImputers with an estimator
+    """
+    imputers = {'Zero imputation': SimpleImputer(missing_values=np.nan, add_indicator=True,
+                                                 strategy='constant', fill_value=0),
+                'Mean Imputation': SimpleImputer(missing_values=np.nan, strategy="mean",
+                                                 add_indicator=True),
+                'KNN Imputation': KNNImputer(missing_values=np.nan, add_indicator=True,
+                                             n_neighbors=5, weights='distance'),
+                'Iterative Imputation': IterativeImputer(missing_values=np.nan, max_iter=10,
+                                                         add_indicator=True, random_state=0,
+                                                         n_nearest_features=5, sample_posterior=True)
+               }
+    for estimator in iterative_estimators or []:
+        bayesian = 'BayesianRidge' in str(estimator)
+        imputers['Iterative {}'.format(estimator_name(estimator))] = IterativeImputer(
+            estimator=estimator, missing_values=np.nan, max_iter=max_iter, add_indicator=True,
+            random_state=0, n_nearest_features=5 if bayesian else None, sample_posterior=bayesian)
+    return imputers
+
+class FoldCache:
+    """
+    Cache of scaled and imputed fold matrices, keyed by a hash of the data, the
+    fold and the imputer configuration, so every model and target sharing a
+    configuration reuses them. Matrices are also saved to disk when a path is
+    given, so later runs skip the imputation entirely. Hits and misses count
+    the lookups of distinct keys before imputing, and fetches every get().
+    :param path: (str) directory to save the matrices to, in memory only if None
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self._matrices = {}
+        if path is not None and not os.path.isdir(path):
+            os.makedirs(path)
+
+    def _file(self, key):
+        return os.path.join(self.path, '{}.joblib'.format(key))
+
+    def __contains__(self, key):
+        return key in self._matrices or (self.path is not None and os.path.isfile(self._file(key)))
+
+    def lookup(self, key):
+        """
+        This function checks whether the matrices of a key are already cached,
+        counting a hit or a miss. Look up each distinct key once, before
+        imputing the missing ones.
+        :param key: (str) key from impute_key()
+        """
+        found = key in self
+        if found:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return found
+
+    def get(self, key):
+        """
+        This function returns the cached (train, test) matrices of a key.
+        :param key: (str) key from impute_key()
+        """
+        if key not in self._matrices:
+            self._matrices[key] = load(self._file(key), mmap_mode='r')
+        self.fetches += 1
+        return self._matrices[key]
+
+    def put(self, key, matrices):
+        """
+        This function stores the (train, test) matrices of a key.
+        :param key: (str) key from impute_key()
+        :param matrices: (tuple) imputed train and test matrices
+        """
+        self._matrices[key] = matrices
+        if self.path is not None:
+            dump(matrices, self._file(key))
+
+def make_folds(y, model, n_splits=N_SPLITS):
+    """
+    This function returns the (train, test) index arrays cross_val_score uses
+    for a model: stratified folds for classifiers, plain folds otherwise.
+    :param y: (Series) target
+    :param model: (estimator) model to be scored
+    :param n_splits: (int) number of folds
+    """
+    cv = check_cv(n_splits, y, classifier=is_classifier(model))
+    return [(train, test) for train, test in cv.split(np.zeros((len(y), 1)), y)]
+
+def impute_key(data_key, train, imputer, scale=True):
+    """
+    This function returns the cache key of a fold matrix.
+    :param data_key: (str) hash of the feature matrix
+    :param train: (array) training row positions of the fold
+    :param imputer: (estimator) unfitted imputer
+    :param scale: (bool) whether the features are scaled before imputing
+    """
+    return joblib_hash((data_key, train, imputer, scale))
+
+def impute_fold(X, train, test, imputer, scale=True):
+    """
+    This function scales and imputes one fold as the scaler and imputer steps
+    of a Pipeline do, returning the train and test matrices.
+    :param X: (array) feature matrix with NaN
+    :param train: (array) training row positions
+    :param test: (array) test row positions
+    :param imputer: (estimator) unfitted imputer
+    :param scale: (bool) whether to standardize the features first
+    """
+    # Fortran order, as a DataFrame's values, so sums match Pipeline exactly
+    X_train, X_test = np.asfortranarray(X[train]), np.asfortranarray(X[test])
+    if scale:
+        scaler = StandardScaler().fit(X_train)
+        X_train, X_test = scaler.transform(X_train), scaler.transform(X_test)
+    imputer = clone(imputer)
+    X_train = imputer.fit_transform(X_train)
+    return X_train, imputer.transform(X_test)
+
+def score_fold(model, X_train, X_test, y_train, y_test, scoring):
+    """
+    This function fits a model on an imputed fold and returns its test score
+    and the seconds it took.
+    :param model: (estimator) unfitted model
+    :param X_train: (array) imputed training matrix
+    :param X_test: (array) imputed test matrix
+    :param y_train: (array) training target
+    :param y_test: (array) test target
+    :param scoring: (str) scikit-learn scorer name, such as 'r2' or 'roc_auc'
+    """
+    start = time.time()
+    model = clone(model).fit(X_train, y_train)
+    score = get_scorer(scoring)(model, X_test, y_test)
+    return score, time.time() - start
+
+def compare_imputers(X, targets, models, scoring, imputers=None, scale=True,
+                     n_splits=N_SPLITS, n_jobs=-1, cache=None):
+    """
+    This function scores every combination of imputer, model and target with
+    cross validation, like the notebook's compare_imputer_scores(), but with
+    every imputed fold computed once and shared, and the work spread across
+    processes. Returns a tidy dataframe with one row per combination and fold.
+    :param X: (DataFrame) feature matrix with NaN
+    :param targets: (dict or Series) target Series by name, or a single Series
+    :param models: (list or dict) models to score, by name if a dict
+    :param scoring: (str) scikit-learn scorer name, such as 'r2' or 'roc_auc'
+    :param imputers: (dict) imputers by label, default_imputers() if None
+    :param scale: (bool) whether to standardize the features before imputing
+    :param n_splits: (int) number of folds
+    :param n_jobs: (int) number of processes, -1 for every CPU
+    :param cache: (FoldCache) cache of imputed fold matrices, a new in-memory
+                              cache if None
+    """
+    if isinstance(targets, pd.Series):
+        targets = {targets.name: targets}
+    if not isinstance(models, dict):
+        models = {estimator_name(model): model for model in models}
+    if imputers is None:
+        imputers = default_imputers()
+    if cache is None:
+        cache = FoldCache()
+    values = X.to_numpy(dtype='float64')
+    data_key = joblib_hash(values)
+
+    # Folds of every model and target, and the imputations they need
+    tasks = []
+    to_impute = {}
+    looked_up = set()
+    for target_name, y in targets.items():
+        y = y.loc[X.index].to_numpy()
+        for model_name, model in models.items():
+            for fold, (train, test) in enumerate(make_folds(y, model, n_splits)):
+                for label, imputer in imputers.items():
+                    key = impute_key(data_key, train, imputer, scale)
+                    if key not in looked_up:
+                        looked_up.add(key)
+                        if not cache.lookup(key):
+                            to_impute[key] = (train, test, imputer)
+                    tasks.append((target_name, model_name, label, fold, key, y[train], y[test]))
+
+    # Impute every distinct fold once
+    print('Imputing {} folds, {} cached'.format(len(to_impute), len(looked_up) - len(to_impute)))
+    matrices = Parallel(n_jobs=n_jobs)(delayed(impute_fold)(values, train, test, imputer, scale)
+                                       for train, test, imputer in to_impute.values())
+    for key, fold_matrices in zip(to_impute, matrices):
+        cache.put(key, fold_matrices)
+
+    # Fit and score the models on the imputed folds
+    print('Scoring {} fits'.format(len(tasks)))
+    scores = Parallel(n_jobs=n_jobs)(delayed(score_fold)(models[model_name], *cache.get(key),
+                                                         y_train, y_test, scoring)
+                                     for target_name, model_name, label, fold, key, y_train, y_test in tasks)
+    return pd.DataFrame([[target_name, model_name, label, fold, score, seconds]
+                         for (target_name, model_name, label, fold, key, _, _), (score, seconds)
+                         in zip(tasks, scores)],
+                        columns=['Target', 'Model', 'Imputer', 'Fold', 'Score', 'Seconds'])
+
+def summarize_scores(results):
+    """
+    This function returns the mean and standard deviation of the fold scores of
+    compare_imputers() for each target, model and imputer, as the notebook's
+    bar charts show them.
+    :param results: (DataFrame) results of compare_imputers()
+    """
+    grouped = results.groupby(['Target', 'Model', 'Imputer'], sort=False)['Score']
+    summary = pd.DataFrame({'Mean Score': grouped.mean(),
+                            'Std Score': grouped.std(ddof=0)
+                           })
+    return summary.reset_index()
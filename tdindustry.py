@@ -0,0 +1,187 @@
+import hashlib
+import numpy as np
+import os
+import pandas as pd
+from tddata import snapshot_date
+from tdsnapshot import Snapshot
+
+def industry_id(benchmark):
+    """
+    This function names an industry by a short hash of its benchmark values.
+    The valuation tab does not name the industry a ticker is compared with,
+    but every ticker of an industry shows the same industry values, so equal
+    values mean the same industry. Missing values are left out of the hash.
+    :param benchmark: (Series) industry values indexed by metric
+    """
+    digest = hashlib.sha1()
+    for metric, value in benchmark.dropna().sort_index().items():
+        digest.update('{}\x00{!r}\x00'.format(metric, value).encode())
+    return digest.hexdigest()[:12]
+
+def match_industries(benchmarks, min_overlap=3):
+    """
+    This function groups tickers into industries by their benchmark values.
+    A ticker's table can lack or blank some of its industry's rows, such as
+    the dividend rows, so a ticker joins an industry when their values agree
+    on every metric both report, and on at least min_overlap of them. Tickers
+    are matched from the most complete table down, each industry taking the
+    values its members add, and a ticker matching several industries joins
+    the one it shares the most metrics with. Returns the benchmark of each
+    industry by industry_id(), and the industry of each ticker. Tickers
+    without any industry value are left out.
+    :param benchmarks: (dict) industry values indexed by metric, by ticker
+    :param min_overlap: (int) fewest shared metrics for a ticker to join an industry
+    """
+    wide = pd.DataFrame(benchmarks).T.astype('float64')
+    if wide.empty:
+        return {}, {}
+    values = wide.to_numpy()
+    present = ~np.isnan(values)
+    canon = np.empty((0, values.shape[1]))
+    groups = []
+    for row in np.argsort(-present.sum(axis=1), kind='stable'):
+        if not present[row].any():
+            continue
+        common = present[row] & ~np.isnan(canon)
+        agree = ((canon == values[row]) | ~common).all(axis=1)
+        overlap = np.where(agree, common.sum(axis=1), 0)
+        if len(overlap) and overlap.max() >= min_overlap:
+            match = int(np.argmax(overlap))
+            canon[match] = np.where(np.isnan(canon[match]), values[row], canon[match])
+            groups[match].append(wide.index[row])
+        else:
+            canon = np.vstack([canon, values[row]])
+            groups.append([wide.index[row]])
+
+    industries = {}
+    members = {}
+    for benchmark, tickers in zip(canon, groups):
+        benchmark = pd.Series(benchmark, index=wide.columns).dropna()
+        industry = industry_id(benchmark)
+        industries[industry] = benchmark
+        members.update({ticker: industry for ticker in tickers})
+    return industries, members
+
+def split_valuations(valuations, date=None, min_overlap=3):
+    """
+    This function splits the valuation tables of a snapshot into the tickers'
+    own values and one deduplicated table of industry benchmarks. Returns the
+    values (tickers x metrics), the benchmarks indexed by (Snapshot, Industry,
+    Metric) with 'Type' and 'Value' columns, and the members, indexed by
+    ticker with the 'Snapshot' and 'Industry' each ticker is compared with.
+    :param valuations: (dict) valuation dataframes by ticker, such as
+                              Snapshot.table('valuation')
+    :param date: (datetime) snapshot date
+    :param min_overlap: (int) fewest shared metrics for a ticker to join an
+                              industry, see match_industries()
+    """
+    values = {}
+    ticker_benchmarks = {}
+    types = {}
+    for ticker, df in valuations.items():
+        if df.empty or ticker not in df.columns:
+            continue
+        # A tab without data can repeat the rows of the previous tab, keep the
+        # first as the combined df does
+        df = df[~df.index.duplicated(keep='first')]
+        values[ticker] = df[ticker]
+        if 'Industry' not in df.columns:
+            continue
+        ticker_benchmarks[ticker] = pd.Series(df['Industry'].to_numpy(dtype='float64'), index=df.index)
+        for metric, kind in df['Type'].items():
+            types.setdefault(metric, kind)
+    benchmarks, members = match_industries(ticker_benchmarks, min_overlap)
+
+    values = pd.DataFrame(values).T.astype('float64')
+    values.index.name = 'Ticker'
+    values.columns.name = None
+    date = pd.Timestamp(date) if date is not None else pd.NaT
+    if benchmarks:
+        table = pd.concat(benchmarks, names=['Industry', 'Metric']).rename('Value').reset_index()
+        table.insert(1, 'Type', table['Metric'].map(types))
+    else:
+        table = pd.DataFrame(columns=['Industry', 'Type', 'Metric', 'Value'])
+    table.insert(0, 'Snapshot', date)
+    table = table.set_index(['Snapshot', 'Industry', 'Metric'])[['Type', 'Value']]
+    members = pd.DataFrame({'Snapshot': date, 'Industry': pd.Series(members, dtype=object)})
+    members.index.name = 'Ticker'
+    return values, table, members
+
+def industry_values(benchmarks, members, metrics=None):
+    """
+    This function returns the industry value of every metric for every ticker,
+    by looking up each ticker's industry in the benchmark table.
+    :param benchmarks: (DataFrame) benchmarks from split_valuations()
+    :param members: (DataFrame) members from split_valuations()
+    :param metrics: (list) metrics to return, all of the table if None
+    """
+    wide = benchmarks['Value'].unstack('Metric')
+    if metrics is not None:
+        wide = wide.reindex(columns=metrics)
+    rows = pd.MultiIndex.from_arrays([members['Snapshot'], members['Industry']])
+    result = wide.reindex(rows)
+    result.index = members.index
+    result.columns.name = None
+    return result
+
+def ratio_to_industry(values, benchmarks, members):
+    """
+    This function computes the 'Ratio to Industry' of every ticker and metric
+    at once, as scrape_valuation() does for one ticker.
+    :param values: (DataFrame) tickers' own values from split_valuations()
+    :param benchmarks: (DataFrame) benchmarks from split_valuations()
+    :param members: (DataFrame) members from split_valuations()
+    """
+    industry = industry_values(benchmarks, members, list(values.columns)).reindex(values.index)
+    return values / industry
+
+def peer_rank(values, members, pct=True):
+    """
+    This function ranks every metric of every ticker among the tickers of the
+    same industry, averaging ties. Tickers without an industry get NaN.
+    :param values: (DataFrame) values indexed by ticker, such as split_valuations()
+                               values or a combined df's numeric columns
+    :param members: (DataFrame) members from split_valuations()
+    :param pct: (bool) whether to divide ranks by the number of peers with a value
+    """
+    industry = members['Industry'].reindex(values.index)
+    return values.groupby(industry.to_numpy(), dropna=True).rank(pct=pct).reindex(values.index)
+
+def peer_median_ratio(values, members):
+    """
+    This function divides every metric of every ticker by the median of the
+    same industry's tickers in the watchlist, a peer benchmark that is also
+    available for metrics the valuation tab does not compare.
+    :param values: (DataFrame) values indexed by ticker
+    :param members: (DataFrame) members from split_valuations()
+    """
+    industry = members['Industry'].reindex(values.index)
+    medians = values.groupby(industry.to_numpy(), dropna=True).transform('median')
+    return values / medians.reindex(values.index)
+
+def save_industry_tables(database_path, snapshot=None):
+    """
+    This function writes the industry benchmarks and members of a scraped
+    watchlist database to industry_benchmarks.csv and industry_members.csv in
+    the database directory. Returns the values, benchmarks and members.
+    :param database_path: (str) The location of the database
+    :param snapshot: (Snapshot) snapshot handle of the database, a new one if None
+    """
+    if snapshot is None:
+        snapshot = Snapshot(database_path)
+    values, benchmarks, members = split_valuations(snapshot.table('valuation'), snapshot_date(database_path))
+    benchmarks.to_csv(os.path.join(database_path, 'industry_benchmarks.csv'))
+    members.to_csv(os.path.join(database_path, 'industry_members.csv'))
+    return values, benchmarks, members
+
+def load_industry_tables(database_path):
+    """
+    This function reads the industry benchmarks and members written by
+    save_industry_tables().
+    :param database_path: (str) The location of the database
+    """
+    benchmarks = pd.read_csv(os.path.join(database_path, 'industry_benchmarks.csv'),
+                             parse_dates=['Snapshot'], index_col=['Snapshot', 'Industry', 'Metric'])
+    members = pd.read_csv(os.path.join(database_path, 'industry_members.csv'),
+                          parse_dates=['Snapshot'], index_col='Ticker')
+    return benchmarks, members
@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+from scipy.special import ndtri
+
+def sort_by_group(values, groups):
+    """
+    This function sorts every row of a features x samples matrix by value within
+    groups of samples, missing values last. Samples are ordered by group once,
+    then each group is sorted for all features at once. Returns the sorting
+    order, the sorted values, and for every sorted position the first position
+    of its group and the number of non-missing values in its group.
+    :param values: (array) features x samples float matrix
+    :param groups: (array) integer group code of each sample
+    """
+    by_group = np.argsort(groups, kind='stable')
+    bounds = np.flatnonzero(np.diff(groups[by_group])) + 1
+    bounds = np.concatenate([[0], bounds, [len(groups)]])
+    grouped = values[:, by_group]
+
+    order = np.empty(values.shape, dtype='int64')
+    sorted_values = np.empty(values.shape)
+    group_start = np.empty(values.shape, dtype='int64')
+    count = np.empty(values.shape, dtype='int64')
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        segment = grouped[:, start:end]
+        local = np.argsort(segment, axis=1)
+        order[:, start:end] = by_group[start:end][local]
+        sorted_values[:, start:end] = np.take_along_axis(segment, local, axis=1)
+        group_start[:, start:end] = start
+        count[:, start:end] = (~np.isnan(segment)).sum(axis=1)[:, None]
+    return order, sorted_values, group_start, count
+
+def by_feature_blocks(X, transform, level=0, block_size=16):
+    """
+    This function applies a transform to the features of a dataframe a block
+    at a time, which bounds the memory of the sorts to block_size features.
+    The transform takes a features x samples float block, with NaN for missing
+    and infinite values, and the date group code of each sample, and returns
+    the transformed block in the same order.
+    :param X: (DataFrame) features indexed by (date, ticker)
+    :param transform: (function) block transform
+    :param level: (int or str) index level of the dates
+    :param block_size: (int) number of features per block
+    """
+    groups = pd.factorize(X.index.get_level_values(level))[0]
+    result = np.empty(X.shape)
+    for start in range(0, X.shape[1], block_size):
+        block = np.ascontiguousarray(X.iloc[:, start:start + block_size].to_numpy(dtype='float64').T)
+        block[~np.isfinite(block)] = np.NaN
+        result[:, start:start + block_size] = transform(block, groups).T
+    return pd.DataFrame(result, index=X.index, columns=X.columns)
+
+def _unsort(order, sorted_values):
+    """
+    This function puts sorted rows back in the original sample order.
+    """
+    values = np.empty(sorted_values.shape)
+    np.put_along_axis(values, order, sorted_values, axis=1)
+    return values
+
+def _sorted_ranks(values, groups):
+    """
+    This function returns the sorting order of sort_by_group(), the ranks of the
+    sorted values with ties averaged, and the number of values of their group.
+    """
+    order, sorted_values, group_start, count = sort_by_group(values, groups)
+    n_rows = values.shape[1]
+    positions = np.broadcast_to(np.arange(n_rows), values.shape)
+
+    # Runs of equal values get the average of their positions
+    new_run = np.ones(values.shape, dtype=bool)
+    new_run[:, 1:] = ((sorted_values[:, 1:] != sorted_values[:, :-1]) |
+                      (group_start[:, 1:] != group_start[:, :-1]))
+    run_start = np.maximum.accumulate(np.where(new_run, positions, 0), axis=1)
+    run_last = np.ones(values.shape, dtype=bool)
+    run_last[:, :-1] = new_run[:, 1:]
+    run_end = np.minimum.accumulate(np.where(run_last, positions, n_rows - 1)[:, ::-1], axis=1)[:, ::-1]
+
+    ranks = (run_start + run_end) / 2 - group_start + 1
+    ranks[np.isnan(sorted_values)] = np.NaN
+    return order, ranks, count
+
+def rank_by_date(X, pct=True, level=0):
+    """
+    This function ranks every feature within each date, averaging ties as
+    pandas' rank() does. Missing values stay NaN.
+    :param X: (DataFrame) features indexed by (date, ticker)
+    :param pct: (bool) whether to divide ranks by the number of values of the date
+    :param level: (int or str) index level of the dates
+    """
+    def transform(values, groups):
+        order, ranks, count = _sorted_ranks(values, groups)
+        return _unsort(order, ranks / count if pct else ranks)
+    return by_feature_blocks(X, transform, level)
+
+def gauss_rank_by_date(X, level=0):
+    """
+    This function maps the ranks of every feature within each date onto a
+    standard normal distribution, as Numerai's gaussianized features are.
+    Missing values stay NaN.
+    :param X: (DataFrame) features indexed by (date, ticker)
+    :param level: (int or str) index level of the dates
+    """
+    def transform(values, groups):
+        order, ranks, count = _sorted_ranks(values, groups)
+        return _unsort(order, ndtri((ranks - 0.5) / count))
+    return by_feature_blocks(X, transform, level)
+
+def winsorize_by_date(X, lower=0.01, upper=0.99, level=0):
+    """
+    This function clips every feature within each date to its lower and upper
+    quantiles, interpolated linearly as pandas' quantile() does. Missing values
+    stay NaN.
+    :param X: (DataFrame) features indexed by (date, ticker)
+    :param lower: (float) lower quantile
+    :param upper: (float) upper quantile
+    :param level: (int or str) index level of the dates
+    """
+    def transform(values, groups):
+        order, sorted_values, group_start, count = sort_by_group(values, groups)
+
+        def quantile(q):
+            position = group_start + q * np.maximum(count - 1, 0)
+            below = np.floor(position).astype('int64')
+            above = np.minimum(below + 1, group_start + np.maximum(count - 1, 0))
+            low = np.take_along_axis(sorted_values, below, axis=1)
+            high = np.take_along_axis(sorted_values, above, axis=1)
+            return low + (high - low) * (position - below)
+
+        return _unsort(order, np.clip(sorted_values, quantile(lower), quantile(upper)))
+    return by_feature_blocks(X, transform, level)
+
+def neutralize_by_date(X, exposures, proportion=1.0, intercept=True, level=0):
+    """
+    This function removes from every feature, within each date, the part
+    explained by a least squares fit on the exposures, such as market cap or
+    beta. Each feature is fitted on the tickers where it has a value, and
+    missing exposures are filled with the mean of their date. Exposure columns
+    of X are returned unchanged.
+    :param X: (DataFrame) features indexed by (date, ticker)
+    :param exposures: (list or DataFrame) exposure columns of X, or a dataframe
+                                          of exposures with the same index
+    :param proportion: (float) share of the fitted part to remove
+    :param intercept: (bool) whether to also remove each date's mean
+    :param level: (int or str) index level of the dates
+    """
+    if isinstance(exposures, pd.DataFrame):
+        E = exposures.reindex(X.index)
+        columns = list(X.columns)
+    else:
+        E = X[list(exposures)]
+        columns = [col for col in X.columns if col not in list(exposures)]
+    E = E.replace([np.inf, -np.inf], np.NaN)
+    E = E.fillna(E.groupby(level=level).transform('mean')).fillna(0)
+    groups = pd.factorize(X.index.get_level_values(level))[0]
+    values = X[columns].to_numpy(dtype='float64', copy=True)
+    values[~np.isfinite(values)] = np.NaN
+    exposure_values = E.to_numpy(dtype='float64')
+    if intercept:
+        exposure_values = np.column_stack([np.ones(len(E)), exposure_values])
+    n_exposures = exposure_values.shape[1]
+
+    result = values.copy()
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0)
+    for rows in pd.Series(groups).groupby(groups).indices.values():
+        e = exposure_values[rows]
+        mask = present[rows].astype('float64')
+        # Normal equations of every feature at once: E' diag(mask) E and E' x
+        pairs = (e[:, :, None] * e[:, None, :]).reshape(len(rows), -1)
+        gram = (pairs.T @ mask).T.reshape(-1, n_exposures, n_exposures)
+        moments = (e.T @ filled[rows]).T
+        beta = np.einsum('kij,kj->ki', np.linalg.pinv(gram), moments)
+        result[rows] = values[rows] - proportion * (e @ beta.T)
+
+    neutral = pd.DataFrame(result, index=X.index, columns=columns)
+    return pd.concat([neutral, X.drop(columns=columns)], axis=1)[X.columns]
@@ -0,0 +1,134 @@
+import os
+import pandas as pd
+from tddata import build_big_df, list_tickers, snapshot_date
+
+class SnapshotPanel:
+    """
+    Append-only panel of combined snapshots indexed by (snapshot date, ticker).
+    Each ingested snapshot is kept in its own partition file, and a small index
+    of which tickers each snapshot holds answers point-in-time queries, so only
+    the partitions a query needs are ever read.
+    :param path: (str) directory holding the partitions and the index
+    :param cache_size: (int) number of partitions kept in memory between queries
+    """
+    def __init__(self, path, cache_size=4):
+        self.path = path
+        self.cache_size = cache_size
+        self._cache = {}
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        index_path = os.path.join(path, 'index.pkl')
+        if os.path.isfile(index_path):
+            self.index = pd.read_pickle(index_path)
+        else:
+            self.index = pd.DataFrame({'Snapshot': pd.Series(dtype='datetime64[ns]'),
+                                       'Ticker': pd.Series(dtype=object)
+                                      })
+
+    @property
+    def snapshots(self):
+        """
+        This function lists the snapshot dates in the panel, oldest first.
+        """
+        return sorted(pd.to_datetime(self.index['Snapshot'].unique()))
+
+    def _partition_path(self, date):
+        return os.path.join(self.path, '{}.pkl'.format(pd.Timestamp(date).strftime('%Y-%m-%d')))
+
+    def ingest(self, database_path, tickers=None, big_df=None, compact=False):
+        """
+        This function appends a previously scraped watchlist database to the
+        panel. Snapshots already in the panel are left untouched.
+        :param database_path: (str) The location of the database
+        :param tickers: (list-like) The securities to be gathered, all if None
+        :param big_df: (DataFrame) the database's combined df if already built
+                                   with build_big_df(), to avoid reading it again
+        :param compact: (bool) whether to store the snapshot in memory-compact
+                               dtypes, see compact_dtypes()
+        """
+        date = pd.Timestamp(snapshot_date(database_path))
+        if date in self.snapshots:
+            print("Snapshot {} already in panel, skipping".format(date.date()))
+            return
+        if big_df is None:
+            if tickers is None:
+                tickers = list_tickers(database_path)
+            big_df = build_big_df(tickers, database_path, compact=compact)
+        big_df.to_pickle(self._partition_path(date))
+
+        # Rewrite the index with the new snapshot's tickers
+        new = pd.DataFrame({'Snapshot': date, 'Ticker': big_df.index.astype(object)})
+        index = pd.concat([self.index.astype({'Ticker': object}), new], axis=0, ignore_index=True)
+        index['Ticker'] = index['Ticker'].astype('category')
+        index.to_pickle(os.path.join(self.path, 'index.pkl'))
+        self.index = index
+
+    def load_snapshot(self, date, columns=None):
+        """
+        This function returns the combined df of one snapshot.
+        :param date: (str or datetime) snapshot date
+        :param columns: (list) columns to return, all if None
+        """
+        date = pd.Timestamp(date)
+        if date not in self._cache:
+            if len(self._cache) >= self.cache_size:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[date] = pd.read_pickle(self._partition_path(date))
+        df = self._cache[date]
+        if columns is None:
+            return df.copy()
+        return df.reindex(columns=columns)
+
+    def as_of(self, date, tickers=None, columns=None, max_age=None):
+        """
+        This function returns the latest values of each ticker as of a date, from
+        the most recent snapshot on or before the date that holds the ticker.
+        Only the partitions holding those rows are read. Returns a dataframe
+        indexed by ticker, with the date of the row used in 'Snapshot'.
+        :param date: (str or datetime) point in time of the query
+        :param tickers: (list-like) securities to return, all if None
+        :param columns: (list) columns to return, all if None
+        :param max_age: (str or timedelta) ignore snapshots older than this
+                                           before the date, e.g. '30D'
+        """
+        date = pd.Timestamp(date)
+        index = self.index[self.index['Snapshot'] <= date]
+        if max_age is not None:
+            index = index[index['Snapshot'] >= date - pd.Timedelta(max_age)]
+        if tickers is not None:
+            index = index[index['Ticker'].isin(tickers)]
+        latest = index.groupby('Ticker', observed=True)['Snapshot'].max()
+
+        frames = []
+        for snapshot, group in latest.groupby(latest):
+            df = self.load_snapshot(snapshot, columns)
+            frames.append(df.loc[group.index.astype(object)].assign(Snapshot=snapshot))
+        if not frames:
+            return pd.DataFrame(columns=(list(columns) if columns is not None else []) + ['Snapshot'])
+        result = pd.concat(frames, axis=0, sort=False)
+        if tickers is not None:
+            result = result.reindex([ticker for ticker in tickers if ticker in result.index])
+        return result
+
+    def history(self, tickers=None, columns=None, start=None, end=None):
+        """
+        This function returns the rows of every snapshot between two dates as a
+        panel indexed by (snapshot date, ticker).
+        :param tickers: (list-like) securities to return, all if None
+        :param columns: (list) columns to return, all if None
+        :param start: (str or datetime) first snapshot date, from the first if None
+        :param end: (str or datetime) last snapshot date, to the last if None
+        """
+        frames = {}
+        for snapshot in self.snapshots:
+            if start is not None and snapshot < pd.Timestamp(start):
+                continue
+            if end is not None and snapshot > pd.Timestamp(end):
+                continue
+            df = self.load_snapshot(snapshot, columns)
+            if tickers is not None:
+                df = df.loc[df.index.intersection(tickers)]
+            frames[snapshot] = df
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, axis=0, names=['Snapshot', 'Ticker'], sort=True)
@@ -0,0 +1,187 @@
+import numpy as np
+import os
+import pandas as pd
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+try:
+    import yfinance as yf
+except ImportError:
+    yf = None
+
+# Revise some tickers from numerai-ticker-map to the current using ones.
+TICKER_CHANGE = {'ADS': 'BFH', 'SGMS': 'LNW', 'LLNW': 'EGIO', 'ADEAV': 'ADEA',
+                 'ETH': 'ETD', 'BOMN': 'BOC', 'ANTM': 'ELV', 'JCOM': 'ZD', 'FB': 'META',
+                 'NCBS': 'NIC', 'ELY': 'MODG', 'PVAC': 'ROCC', 'BLL': 'BALL', 'RLGY': 'HOUS',
+                 'VIAC': 'PARA'}
+
+def read_prices(file_path):
+    """
+    This function reads closing prices from a CSV or Parquet file, either wide
+    with a date column and one column per symbol, or long with 'Date', 'Ticker'
+    and 'Close' columns. Returns a wide dataframe indexed by date.
+    :param file_path: (str) .csv or .parquet file
+    """
+    if file_path.endswith('.parquet'):
+        df = pd.read_parquet(file_path)
+    else:
+        df = pd.read_csv(file_path)
+    if {'Date', 'Ticker', 'Close'} <= set(df.columns):
+        df = df.pivot_table(index='Date', columns='Ticker', values='Close', aggfunc='last')
+    elif 'Date' in df.columns:
+        df = df.set_index('Date')
+    elif not isinstance(df.index, pd.DatetimeIndex):
+        # Dates in the first column, as DataFrame.to_csv() writes them
+        df = df.set_index(df.columns[0])
+    df.index = pd.to_datetime(df.index).tz_localize(None).normalize()
+    df.index.name = 'Date'
+    df.columns.name = None
+    return df.astype('float64').sort_index()
+
+class PriceStore:
+    """
+    Local store of daily closing prices, one column per symbol, saved as
+    Parquet when pyarrow is installed and as CSV otherwise. It is filled from
+    files with add_file() or from Yahoo Finance with update(), which only
+    downloads the days after the last stored one, and computes returns for
+    any number of horizons and snapshot dates offline.
+    :param path: (str) directory of the store
+    :param symbol_map: (dict) current symbol of renamed tickers
+    """
+    def __init__(self, path, symbol_map=TICKER_CHANGE):
+        self.path = path
+        self.symbol_map = dict(symbol_map)
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self.closes = pd.DataFrame(index=pd.DatetimeIndex([], name='Date'), dtype='float64')
+        for name in ['closes.parquet', 'closes.csv']:
+            if os.path.isfile(os.path.join(path, name)):
+                self.closes = read_prices(os.path.join(path, name))
+                break
+
+    def save(self):
+        """
+        This function saves the store.
+        """
+        if pyarrow is not None:
+            self.closes.to_parquet(os.path.join(self.path, 'closes.parquet'))
+        else:
+            self.closes.to_csv(os.path.join(self.path, 'closes.csv'))
+
+    def add(self, closes):
+        """
+        This function merges closing prices into the store, new values replacing
+        stored ones for the same day and symbol, and saves it.
+        :param closes: (DataFrame) wide closing prices indexed by date
+        """
+        closes = closes.copy()
+        closes.index = pd.to_datetime(closes.index).tz_localize(None).normalize()
+        self.closes = closes.combine_first(self.closes).sort_index()
+        self.closes.index.name = 'Date'
+        self.save()
+
+    def add_file(self, file_path):
+        """
+        This function merges the closing prices of a CSV or Parquet file, see
+        read_prices() for the layouts.
+        :param file_path: (str) .csv or .parquet file
+        """
+        self.add(read_prices(file_path))
+
+    def symbols(self, tickers):
+        """
+        This function maps tickers to their current symbols.
+        :param tickers: (list-like) ticker symbols
+        """
+        return [self.symbol_map.get(ticker, ticker) for ticker in tickers]
+
+    def update(self, tickers, end=None, start='2000-01-01'):
+        """
+        This function downloads closing prices from Yahoo Finance for the days
+        after the last stored day, or from start for symbols not in the store.
+        :param tickers: (list-like) ticker symbols, renamed by the symbol map
+        :param end: (str or datetime) last day to download, today if None
+        :param start: (str or datetime) first day for symbols not in the store
+        """
+        if yf is None:
+            raise ValueError("yfinance is required to download prices, use add_file() offline")
+        symbols = sorted(set(self.symbols(tickers)))
+        new = [symbol for symbol in symbols if symbol not in self.closes.columns]
+        old = [symbol for symbol in symbols if symbol in self.closes.columns]
+        end = pd.Timestamp(end) if end is not None else pd.Timestamp.today().normalize()
+        batches = []
+        if old and len(self.closes.index):
+            batches.append((old, self.closes.index[-1] + pd.Timedelta('1D')))
+        if new:
+            batches.append((new, pd.Timestamp(start)))
+        for batch, batch_start in batches:
+            if batch_start > end:
+                continue
+            print("Downloading {} symbols from {}".format(len(batch), batch_start.date()))
+            history = yf.Tickers(batch).history(start=batch_start, end=end + pd.Timedelta('1D'))
+            self.add(history['Close'])
+
+    def returns(self, index, horizons=(5,), kinds=('log', 'simple')):
+        """
+        This function computes the returns of every (snapshot date, ticker) row
+        over every horizon in one vectorized pass. A return starts at the close
+        of the first trading day on or after the snapshot date. Integer horizons
+        count trading days; offset strings such as '17D' end at the last trading
+        day before the snapshot date plus the offset, as yfinance's end date
+        does. Missing start or end prices give NaN. Returns a dataframe with the
+        same index and columns such as 'log_return_5'.
+        :param index: (MultiIndex) (snapshot date, ticker) rows, such as the
+                                   index of SnapshotPanel.history()
+        :param horizons: (list) trading day counts or offset strings
+        :param kinds: (list) 'log' and/or 'simple'
+        """
+        snapshots = pd.to_datetime(index.get_level_values(0)).normalize()
+        tickers = index.get_level_values(1)
+        dates = self.closes.index.values
+        values = self.closes.to_numpy(dtype='float64')
+
+        # Column of each row's symbol, -1 when the store has no prices for it
+        columns = pd.Index(self.closes.columns).get_indexer(self.symbols(tickers))
+        start = np.searchsorted(dates, snapshots.values, side='left')
+
+        def gather(rows):
+            valid = (columns >= 0) & (rows >= 0) & (rows < len(dates))
+            out = np.full(len(rows), np.NaN)
+            out[valid] = values[rows[valid], columns[valid]]
+            return out
+
+        start_price = gather(start)
+        results = {}
+        for horizon in horizons:
+            if isinstance(horizon, (int, np.integer)):
+                end = start + horizon
+                name = str(horizon)
+            else:
+                end_dates = (snapshots + pd.Timedelta(horizon)).values
+                end = np.searchsorted(dates, end_dates, side='left') - 1
+                end[end <= start] = -1
+                name = horizon
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratio = gather(end) / start_price
+            if 'log' in kinds:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    results['log_return_{}'.format(name)] = np.log(ratio)
+            if 'simple' in kinds:
+                results['simple_return_{}'.format(name)] = ratio - 1
+        return pd.DataFrame(results, index=index)
+
+def make_targets(returns, column):
+    """
+    This function makes the modeling targets from one return column: the
+    return itself as 'log_return', 'class1' for returns above 0 and 'class2'
+    for returns above the average of their snapshot date.
+    :param returns: (DataFrame) result of PriceStore.returns()
+    :param column: (str) return column, such as 'log_return_5'
+    """
+    r = returns[column]
+    mean = r.groupby(level=0).transform('mean')
+    targets = pd.DataFrame({'log_return': r}, index=returns.index)
+    targets['class1'] = (r > 0).astype('float64').where(r.notnull())
+    targets['class2'] = ((r - mean) > 0).astype('float64').where(r.notnull())
+    return targets
@@ -0,0 +1,233 @@
+import numpy as np
+import pandas as pd
+
+# Fields of the combined df in their canonical order, with their dtypes
+COMBINED_FIELDS_V1 = [
+    ('% Above Low', 'float64'),
+    ('% Below High', 'float64'),
+    ('% Held by Institutions', 'float64'),
+    ('52-Wk Range', 'object'),
+    ('5yr Avg Return', 'float64'),
+    ('5yr High', 'float64'),
+    ('5yr Low', 'float64'),
+    ('Annual Dividend $', 'float64'),
+    ('Annual Dividend %', 'float64'),
+    ('Annual Dividend Yield', 'float64'),
+    ('Ask', 'float64'),
+    ('Ask Size', 'float64'),
+    ('Ask close', 'float64'),
+    ('B/A Ratio', 'float64'),
+    ('B/A Size', 'object'),
+    ('Beta', 'float64'),
+    ('Bid', 'float64'),
+    ('Bid Size', 'float64'),
+    ('Bid close', 'float64'),
+    ('Change Since Close', 'object'),
+    ('Change in Debt/Total Capital Quarter over Quarter', 'float64'),
+    ('Closing Price', 'float64'),
+    ('Day Change $', 'float64'),
+    ('Day Change %', 'float64'),
+    ('Day High', 'float64'),
+    ('Day Low', 'float64'),
+    ('Days to Cover', 'float64'),
+    ('Dividend Change %', 'float64'),
+    ('Dividend Growth 5yr', 'float64'),
+    ('Dividend Growth Rate, 3 Years', 'float64'),
+    ('Dividend Pay Date', 'object'),
+    ('EPS (TTM, GAAP)', 'float64'),
+    ('EPS Growth (MRQ)', 'float64'),
+    ('EPS Growth (TTM)', 'float64'),
+    ('EPS Growth 5yr', 'float64'),
+    ('Ex-dividend', 'object'),
+    ('Ex-dividend Date', 'object'),
+    ('FCF Growth 5yr', 'float64'),
+    ('Float', 'float64'),
+    ('Gross Profit Margin (TTM)', 'float64'),
+    ('Growth 1yr Consensus Est', 'float64'),
+    ('Growth 1yr High Est', 'float64'),
+    ('Growth 1yr Low Est', 'float64'),
+    ('Growth 2yr Consensus Est', 'float64'),
+    ('Growth 2yr High Est', 'float64'),
+    ('Growth 2yr Low Est', 'float64'),
+    ('Growth 3yr Historic', 'float64'),
+    ('Growth 5yr Actual/Est', 'float64'),
+    ('Growth 5yr Consensus Est', 'float64'),
+    ('Growth 5yr High Est', 'float64'),
+    ('Growth 5yr Low Est', 'float64'),
+    ('Growth Analysts', 'float64'),
+    ('Historical Volatility', 'float64'),
+    ('Institutions Holding Shares', 'float64'),
+    ('Interest Coverage (MRQ)', 'float64'),
+    ('Last (size)', 'float64'),
+    ('Last (time)', 'object'),
+    ('Last Trade', 'float64'),
+    ('Market Cap', 'object'),
+    ('Market Edge Opinion:', 'object'),
+    ('Net Profit Margin (TTM)', 'float64'),
+    ('Next Earnings Announcement', 'object'),
+    ('Operating Profit Margin (TTM)', 'float64'),
+    ('P/E Ratio (TTM, GAAP)', 'object'),
+    ('PEG Ratio (TTM, GAAP)', 'float64'),
+    ('Prev Close', 'float64'),
+    ('Price/Book (MRQ)', 'float64'),
+    ('Price/Cash Flow (TTM)', 'float64'),
+    ('Price/Earnings (TTM)', 'float64'),
+    ('Price/Earnings (TTM, GAAP)', 'float64'),
+    ('Price/Sales (TTM)', 'float64'),
+    ('Quick Ratio (MRQ)', 'float64'),
+    ('Return On Assets (TTM)', 'float64'),
+    ('Return On Equity (TTM)', 'float64'),
+    ('Return On Investment (TTM)', 'float64'),
+    ('Revenue Growth (MRQ)', 'float64'),
+    ('Revenue Growth (TTM)', 'float64'),
+    ('Revenue Growth 5yr', 'float64'),
+    ('Revenue Per Employee (TTM)', 'float64'),
+    ('Shares Outstanding', 'float64'),
+    ('Short Int Current Month', 'float64'),
+    ('Short Int Pct of Float', 'float64'),
+    ('Short Int Prev Month', 'float64'),
+    ('Short Interest', 'float64'),
+    ("Today's Open", 'float64'),
+    ('Total Debt/Total Capital (MRQ)', 'float64'),
+    ('Volume', 'float64'),
+    ('Volume 10-day Avg', 'float64'),
+    ('Volume Past Day', 'object'),
+    ('cfra', 'object'),
+    ('cfra since', 'datetime64[ns]'),
+    ('ford', 'object'),
+    ('ford since', 'datetime64[ns]'),
+    ('marketEdge', 'object'),
+    ('marketEdge opinion', 'float64'),
+    ('marketEdge opinion since', 'datetime64[ns]'),
+    ('marketEdge since', 'datetime64[ns]'),
+    ('newConstructs', 'object'),
+    ('newConstructs since', 'datetime64[ns]'),
+    ('researchTeam', 'object'),
+    ('researchTeam since', 'datetime64[ns]'),
+    ('theStreet', 'object'),
+    ('theStreet since', 'datetime64[ns]'),
+    ]
+
+# Names the summary page uses for the same field, by canonical name
+COMBINED_SYNONYMS_V1 = {'Price': 'Closing Price'}
+
+class Schema:
+    """
+    Versioned list of the fields of a table, in a fixed order with a dtype for
+    each, and the synonyms that map to them. Rows are assembled into a
+    preallocated array in one pass, and whatever does not fit the schema is
+    kept in a drift report instead of adding columns.
+    :param version: (int) schema version
+    :param fields: (list) (name, dtype) tuples, dtypes being 'float64',
+                          'object' or 'datetime64[ns]'
+    :param synonyms: (dict) canonical field name of other names
+    """
+    def __init__(self, version, fields, synonyms=None):
+        self.version = version
+        self.columns = [name for name, dtype in fields]
+        self.dtypes = dict(fields)
+        self.synonyms = dict(synonyms or {})
+        self.positions = {name: i for i, name in enumerate(self.columns)}
+        for alias, name in self.synonyms.items():
+            self.positions[alias] = self.positions[name]
+
+    def __repr__(self):
+        return 'Schema(version={}, {} fields)'.format(self.version, len(self.columns))
+
+    def canonical(self, name):
+        """
+        This function returns the canonical name of a field, or None if the
+        field is not in the schema.
+        :param name: (str) field name
+        """
+        if name in self.dtypes:
+            return name
+        return self.synonyms.get(name)
+
+    def assemble(self, rows, verbose=True, return_drift=False):
+        """
+        This function assembles rows into a dataframe with the schema's columns
+        and dtypes, by filling a preallocated array. Unknown fields, values that
+        are not numbers in float fields and fields given twice under synonyms
+        are left out and recorded in a drift report of this call, so a schema
+        can assemble several tables at once.
+        :param rows: (list) (ticker, values) tuples, values being a Series or
+                            dict of field values, or a one row dataframe
+        :param verbose: (bool) whether to print the drift report
+        :param return_drift: (bool) return the drift report with the dataframe
+        """
+        rows = list(rows)
+        tickers = [ticker for ticker, values in rows]
+        data = np.full((len(rows), len(self.columns)), np.NaN, dtype=object)
+        is_float = np.array([self.dtypes[name] == 'float64' for name in self.columns])
+        drift = {}
+
+        def record(field, kind, value):
+            entry = drift.setdefault((field, kind), [0, value])
+            entry[0] += 1
+
+        for i, (ticker, values) in enumerate(rows):
+            if isinstance(values, pd.DataFrame):
+                values = values.iloc[0]
+            filled = set()
+            for field, value in values.items():
+                j = self.positions.get(field)
+                if j is None:
+                    if not pd.isnull(value):
+                        record(field, 'unknown field', value)
+                    continue
+                if j in filled:
+                    record(field, 'duplicate', value)
+                    continue
+                filled.add(j)
+                if is_float[j] and not pd.isnull(value):
+                    try:
+                        value = float(value)
+                    except (TypeError, ValueError):
+                        record(field, 'not numeric', value)
+                        continue
+                data[i, j] = value
+
+        columns = {}
+        for j, name in enumerate(self.columns):
+            dtype = self.dtypes[name]
+            if dtype == 'float64':
+                columns[name] = data[:, j].astype('float64')
+            elif dtype.startswith('datetime'):
+                columns[name] = pd.to_datetime(pd.Series(data[:, j], index=tickers), infer_datetime_format=True)
+            else:
+                columns[name] = data[:, j]
+        df = pd.DataFrame(columns, index=tickers, columns=self.columns)
+
+        drift = pd.DataFrame([[field, kind, count, example]
+                              for (field, kind), (count, example) in drift.items()],
+                             columns=['Field', 'Kind', 'Tickers', 'Example'])
+        if verbose and not drift.empty:
+            print('Schema v{} drift:'.format(self.version))
+            print(drift.to_string(index=False))
+        if return_drift:
+            return df, drift
+        return df
+
+SCHEMAS = {1: Schema(1, COMBINED_FIELDS_V1, COMBINED_SYNONYMS_V1)}
+
+def get_schema(version=None):
+    """
+    This function returns a registered schema of the combined df.
+    :param version: (int) schema version, the latest if None
+    """
+    if version is None:
+        version = max(SCHEMAS)
+    if version not in SCHEMAS:
+        raise ValueError("No schema version {}".format(version))
+    return SCHEMAS[version]
+
+def register_schema(schema):
+    """
+    This function registers a new schema version. Registered versions are
+    never replaced, so data assembled with a version can always be rebuilt.
+    :param schema: (Schema) the schema to register
+    """
+    if schema.version in SCHEMAS:
+        raise ValueError("Schema version {} is already registered".format(schema.version))
+    SCHEMAS[schema.version] = schema
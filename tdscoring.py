@@ -0,0 +1,204 @@
+from datetime import datetime
+from joblib import dump, load
+import os
+import pandas as pd
+import re
+import sklearn
+from sklearn.base import clone, is_classifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from tddata import build_big_df, list_tickers
+from tdfeatures import FeatureBuilder
+from tdimpute import default_imputers, estimator_name
+from tdpanel import SnapshotPanel
+from tdschema import get_schema
+import time
+
+FORMAT_VERSION = 1 # Layout of saved pipelines, raised when it changes
+
+class ScoringPipeline:
+    """
+    Everything needed to score a new snapshot with a trained model: the
+    feature schema and encodings of a FeatureBuilder, the scaler, the imputer
+    and the model, fitted together on a training combined df. Saved pipelines
+    are numbered so every model version stays loadable, and carry the
+    metadata of their training run.
+    :param model: (estimator) unfitted model
+    :param builder: (FeatureBuilder) unfitted feature builder, the default one if None
+    :param imputer: (estimator) unfitted imputer, mean imputation if None
+    :param scale: (bool) whether to standardize the features before imputing
+    :param name: (str) name the pipeline is saved under, the model's class name if None
+    :param schema_version: (int) tdschema version snapshot directories are read
+                                 with, which is several times faster, or the
+                                 sorted union of fields as the notebook's
+                                 build_big_df() if None. The training combined
+                                 df must be built the same way
+    """
+    def __init__(self, model, builder=None, imputer=None, scale=True, name=None,
+                 schema_version=None):
+        self.model = model
+        self.builder = builder if builder is not None else FeatureBuilder()
+        self.imputer = imputer if imputer is not None else default_imputers()['Mean Imputation']
+        self.scale = scale
+        self.name = name if name is not None else estimator_name(model)
+        self.schema_version = schema_version
+        self.pipeline = None
+        self.input_columns = None
+        self.metadata = {}
+
+    def __repr__(self):
+        return "ScoringPipeline('{}', version={})".format(self.name, self.metadata.get('version'))
+
+    def fit(self, big_df, y):
+        """
+        This function fits the feature builder on the combined df, and the
+        scaler, imputer and model on the rows with a target.
+        :param big_df: (DataFrame) training combined df, or stacked snapshots
+        :param y: (Series) target with the same index, such as a make_targets() column
+        """
+        X = self.builder.fit_transform(big_df)
+        y = y.reindex(X.index)
+        keep = y.notnull().to_numpy()
+        steps = [('scaler', StandardScaler())] if self.scale else []
+        steps += [('imputer', clone(self.imputer)), ('model', clone(self.model))]
+        self.pipeline = Pipeline(steps).fit(X.to_numpy(dtype='float64')[keep], y.to_numpy()[keep])
+        # Raw columns the builder reads, so scoring loads nothing else
+        self.input_columns = [col for col in big_df.columns if col not in self.builder.to_drop]
+        self.metadata = {'format_version': FORMAT_VERSION,
+                         'version': None,
+                         'trained': datetime.now().isoformat(timespec='seconds'),
+                         'target': y.name,
+                         'n_rows': int(keep.sum()),
+                         'n_features': len(self.builder.columns),
+                         'sklearn_version': sklearn.__version__
+                        }
+        return self
+
+    def predict(self, big_df):
+        """
+        This function scores every row of a combined df in one pass. Returns a
+        dataframe indexed like big_df with the 'Prediction', and for
+        classifiers the 'Probability' of the positive class.
+        :param big_df: (DataFrame) combined df of a snapshot
+        """
+        if self.pipeline is None:
+            raise ValueError("ScoringPipeline must be fitted before predict")
+        return self.predict_matrix(self.builder.transform(big_df).to_numpy(dtype='float64'), big_df.index)
+
+    def predict_matrix(self, values, index):
+        """
+        This function scores a model matrix built by the pipeline's builder.
+        :param values: (array) model matrix
+        :param index: (Index) tickers of the rows
+        """
+        predictions = pd.DataFrame({'Prediction': self.pipeline.predict(values)}, index=index)
+        if is_classifier(self.pipeline) and hasattr(self.pipeline, 'predict_proba'):
+            predictions['Probability'] = self.pipeline.predict_proba(values)[:, -1]
+        return predictions
+
+    def save(self, path):
+        """
+        This function saves the fitted pipeline in a directory as
+        <name>_v<version>.joblib, with the version after the latest one saved.
+        Returns the file path.
+        :param path: (str) directory of saved pipelines
+        """
+        if self.pipeline is None:
+            raise ValueError("ScoringPipeline must be fitted before save")
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self.metadata['version'] = max(pipeline_versions(path, self.name), default=0) + 1
+        file_path = os.path.join(path, '{}_v{}.joblib'.format(self.name, self.metadata['version']))
+        dump(self, file_path)
+        return file_path
+
+    @classmethod
+    def load(cls, path, name=None, version=None):
+        """
+        This function loads a saved pipeline, either from its file or from a
+        directory of saved pipelines by name and version.
+        :param path: (str) .joblib file, or directory of saved pipelines
+        :param name: (str) name of the pipeline, when path is a directory
+        :param version: (int) version to load, the latest if None
+        """
+        if os.path.isdir(path):
+            if version is None:
+                version = max(pipeline_versions(path, name), default=None)
+                if version is None:
+                    raise ValueError("No saved {} pipeline in {}".format(name, path))
+            path = os.path.join(path, '{}_v{}.joblib'.format(name, version))
+        pipeline = load(path)
+        if pipeline.metadata.get('format_version') != FORMAT_VERSION:
+            raise ValueError("{} was saved in format {}, expected {}".format(
+                path, pipeline.metadata.get('format_version'), FORMAT_VERSION))
+        if pipeline.metadata.get('sklearn_version') != sklearn.__version__:
+            print("Pipeline trained with scikit-learn {}, running {}".format(
+                pipeline.metadata.get('sklearn_version'), sklearn.__version__))
+        return pipeline
+
+def pipeline_versions(path, name):
+    """
+    This function lists the versions of a pipeline saved in a directory.
+    :param path: (str) directory of saved pipelines
+    :param name: (str) name of the pipeline
+    """
+    if not os.path.isdir(path):
+        return []
+    pattern = re.compile(r'^{}_v(\d+)\.joblib$'.format(re.escape(name)))
+    return sorted(int(match.group(1)) for match in map(pattern.match, os.listdir(path)) if match)
+
+def score_snapshot(pipeline, source, date=None, tickers=None):
+    """
+    This function scores every ticker of a snapshot in one vectorized pass.
+    Returns the predictions by ticker, and a report of the rows scored and the
+    seconds spent loading, building features and predicting.
+    :param pipeline: (ScoringPipeline or str) pipeline, or path of a saved one
+    :param source: (str or SnapshotPanel) snapshot directory, or panel holding
+                                          the snapshot
+    :param date: (str or datetime) snapshot date, when source is a panel
+    :param tickers: (list-like) tickers to score, all of the snapshot if None
+    """
+    start = time.perf_counter()
+    if isinstance(pipeline, str):
+        pipeline = ScoringPipeline.load(pipeline)
+    load_start = time.perf_counter()
+    if isinstance(source, SnapshotPanel):
+        if date is None:
+            raise ValueError("Pass the snapshot date to score from a panel")
+        big_df = source.load_snapshot(date, columns=pipeline.input_columns)
+        if tickers is not None:
+            big_df = big_df.reindex(tickers)
+    else:
+        if tickers is None:
+            tickers = list_tickers(source)
+        schema = get_schema(pipeline.schema_version) if pipeline.schema_version is not None else None
+        big_df = build_big_df(tickers, source, schema=schema)
+    loaded = time.perf_counter()
+
+    values = pipeline.builder.transform(big_df).to_numpy(dtype='float64')
+    transformed = time.perf_counter()
+    predictions = pipeline.predict_matrix(values, big_df.index)
+    end = time.perf_counter()
+
+    report = pd.Series({'Rows': len(predictions),
+                        'Pipeline Load Seconds': load_start - start,
+                        'Snapshot Load Seconds': loaded - load_start,
+                        'Transform Seconds': transformed - loaded,
+                        'Predict Seconds': end - transformed,
+                        'Total Seconds': end - start
+                       })
+    return predictions, report
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Score every ticker of a snapshot with a saved pipeline')
+    parser.add_argument('pipeline', help='saved pipeline .joblib file')
+    parser.add_argument('snapshot', help='snapshot directory, or panel directory with --date')
+    parser.add_argument('--date', default=None, help='snapshot date to score from a panel')
+    parser.add_argument('--out', default='predictions.csv', help='.csv file for the predictions')
+    args = parser.parse_args()
+
+    source = SnapshotPanel(args.snapshot) if args.date is not None else args.snapshot
+    predictions, report = score_snapshot(args.pipeline, source, args.date)
+    predictions.to_csv(args.out)
+    print(report.to_string())
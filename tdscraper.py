@@ -1,17 +1,55 @@
-from bs4 import BeautifulSoup
+from contextlib import contextmanager, nullcontext
+import cProfile
 from datetime import datetime
+import hashlib
+import importlib
 import json
 import numpy as np
 import os
 import pandas as pd
+import pickle
 import re
-from selenium import webdriver
-from selenium.webdriver.common.by import By
+import sys
+import threading
+try:
+    import psutil
+except ImportError:
+    psutil = None
+from tddata import (build_big_df, combined_dtypes, compact_dtypes, fits_float32,
+                    list_tickers, read_combined, snapshot_date)
+import time
+
+class LazyImport:
+    """
+    Stands in for a module, or an attribute of a module, and imports it on
+    first use, so processes that only load data never import selenium or bs4.
+    :param module: (str) module name
+    :param attr: (str) attribute of the module, the module itself if None
+    """
+    def __init__(self, module, attr=None):
+        self._module = module
+        self._attr = attr
+        self._target = None
+
+    def _load(self):
+        if self._target is None:
+            target = importlib.import_module(self._module)
+            self._target = getattr(target, self._attr) if self._attr else target
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+BeautifulSoup = LazyImport('bs4', 'BeautifulSoup')
+webdriver = LazyImport('selenium.webdriver')
+By = LazyImport('selenium.webdriver.common.by', 'By')
 # from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
+EC = LazyImport('selenium.webdriver.support.expected_conditions')
+WebDriverWait = LazyImport('selenium.webdriver.support.ui', 'WebDriverWait')
 # from tda import auth, client
-import time
 
 def get_keys(path):
     """
@@ -21,12 +59,13 @@ def get_keys(path):
     with open(path) as f:
         return json.load(f)
 
-def search_symbol(driver, ticker):
+def search_symbol(driver, ticker, wait=4):
     """
     This function searches for a ticker symbol on TD Ameritrade website once
     user is logged in.
     :param driver: (Selenium webdriver) webdriver returned from start_bot()
     :param ticker: (str) ticker symbol to search
+    :param wait: (float) seconds to give the page to load
     """
 
     # Attempt the more expedient symbol lookup, rever to main search otherwise
@@ -47,7 +86,7 @@ def search_symbol(driver, ticker):
     elif kind == 'search':
         driver.find_element(By.ID ,"searchIcon").click()
     # Give extra time for webpage to load
-    time.sleep(4)
+    time.sleep(wait)
 
 def reduce_tabs(driver):
     """
@@ -113,6 +152,101 @@ def clean(x, show_errors=False):
     #print('returning {}'.format(x))
     return x   
 
+def container_html(driver, selectors):
+    """
+    This function returns the html of the page containers holding the data of
+    a tab, so that the tab's content can be hashed without making soup.
+    :param driver: (Selenium webdriver) webdriver on the page to read
+    :param selectors: (list) css selectors of the containers, the first match
+                             of each is used and missing ones give ''
+    """
+    htmls = []
+    for selector in selectors:
+        try:
+            htmls.append(driver.find_element(By.CSS_SELECTOR, selector).get_attribute('outerHTML'))
+        except:
+            htmls.append('')
+    return htmls
+
+class PageCache:
+    """
+    Stores the parsed dataframes of a tab keyed by a hash of the tab's page
+    containers, so a page whose content has not changed since a previous
+    snapshot is not parsed and cleaned again. Parsed frames are pickled under
+    path, and the hashes used for each ticker are kept in `keys` so they can be
+    saved with the snapshot.
+    :param path: (str) directory to keep the parsed frames in, kept in memory
+                       only if None
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self.keys = {}
+        self.hits = {}
+        self.misses = {}
+        self._frames = {}
+        if path is not None and not os.path.isdir(path):
+            os.makedirs(path)
+
+    def key(self, ticker, tab, htmls):
+        """
+        This function hashes the container html of a tab and records the hash
+        for the ticker.
+        :param ticker: (str) ticker symbol the page belongs to
+        :param tab: (str) name of the tab
+        :param htmls: (list) html strings of the tab's containers
+        """
+        digest = hashlib.sha1(ticker.encode())
+        for html in htmls:
+            digest.update(b'\x00' + html.encode())
+        key = digest.hexdigest()
+        self.keys.setdefault(ticker, {})[tab] = key
+        return key
+
+    def get(self, tab, key):
+        """
+        This function returns copies of the frames parsed from a page with the
+        given hash, or None if the page has not been seen before.
+        :param tab: (str) name of the tab
+        :param key: (str) hash returned by key()
+        """
+        frames = self._frames.get(key)
+        if frames is None and self.path is not None:
+            file_path = self.path + '/{}.pkl'.format(key)
+            if os.path.isfile(file_path):
+                with open(file_path, 'rb') as f:
+                    frames = pickle.load(f)
+                self._frames[key] = frames
+        if frames is None:
+            self.misses[tab] = self.misses.get(tab, 0) + 1
+            return None
+        self.hits[tab] = self.hits.get(tab, 0) + 1
+        if isinstance(frames, tuple):
+            return tuple(frame.copy() for frame in frames)
+        return frames.copy()
+
+    def put(self, key, frames):
+        """
+        This function stores the frames parsed from a page under its hash.
+        :param key: (str) hash returned by key()
+        :param frames: (DataFrame or tuple) parsed frames to store
+        """
+        self._frames[key] = frames
+        if self.path is not None:
+            with open(self.path + '/{}.pkl'.format(key), 'wb') as f:
+                pickle.dump(frames, f)
+
+    def report(self):
+        """
+        This function returns a dataframe of hits, misses and hit rate per tab.
+        """
+        tabs = sorted(set(self.hits) | set(self.misses))
+        report = pd.DataFrame({'Hits': [self.hits.get(tab, 0) for tab in tabs],
+                               'Misses': [self.misses.get(tab, 0) for tab in tabs]
+                              },
+                              index=tabs)
+        report['Hit Rate'] = report['Hits'] / (report['Hits'] + report['Misses'])
+        return report
+
 def start_bot(keys):
     """
     Starts TD Ameritrade Scraping Bot. Takes input of dictionary containing 
@@ -530,7 +664,8 @@ def scrape_earnings(driver, ticker, search_first=True, internet_speed='fast'):
 
     return earn_df, earnings_yrly
 
-def scrape_fundamentals(driver, ticker, search_first=True, internet_speed='fast'):
+def scrape_fundamentals(driver, ticker, search_first=True, internet_speed='fast',
+                        page_cache=None):
     """
     This function scrapes the "Fundamentals" tab of a TD Ameritrade security
     lookup page
@@ -542,6 +677,8 @@ def scrape_fundamentals(driver, ticker, search_first=True, internet_speed='fast'
                                 desired security, or the wrong data will scrape
     :param internet_speed: (str) set to 'slow' if bot is not working properly due
                                 to slow page loading times.
+    :param page_cache: (PageCache) reuse previously parsed frames when the pages
+                                   are unchanged
     """
     # Search symbol first if flag is True
     if search_first:
@@ -573,9 +710,53 @@ def scrape_fundamentals(driver, ticker, search_first=True, internet_speed='fast'
     WebDriverWait(driver, 10).until(lambda x: EC.text_to_be_present_in_element(x, 'Price Performance'))
     element = driver.find_element(By.XPATH, '//*[@id="price-charts-wrapper"]/div')
     WebDriverWait(driver, 10).until(lambda x: EC.visibility_of_element_located(element))
-      
+    overview_source = driver.page_source
+    htmls = []
+    if page_cache is not None:
+        htmls += container_html(driver, ['div.ui-description-list',
+                                         'div.price-history-chart',
+                                         'div[data-module-name="HistoricGrowthAndShareDetailModule"]'
+                                        ])
+
+    # Get ready to scrape financial reports:
+    report_names = ['Balance Sheet',
+              'Income Statement',
+              'Cash Flow'
+             ]
+    xpaths = [#'//*[@id="layout-full"]/div[4]/nav/nav/a[1]', # Already done
+              '//*[@id="layout-full"]/div[4]/nav/nav/a[2]',
+              '//*[@id="layout-full"]/div[4]/nav/nav/a[3]',
+              '//*[@id="layout-full"]/div[4]/nav/nav/a[4]'
+             ]
+    reports = dict(zip(report_names, xpaths))
+
+    # Load each report, keeping its page source to be parsed later
+    report_sources = {}
+    for name, xpath in reports.items():
+        # Switch to Appropriate Report
+        driver.find_element(By.XPATH, xpath).click()
+        time.sleep(sleep_time)
+        iframes = WebDriverWait(driver, 10).until(lambda x: x.find_elements(By.TAG_NAME, "iframe"))
+        driver.switch_to.frame(iframes[3])
+        driver.switch_to.default_content()
+        iframes = WebDriverWait(driver, 10).until(lambda x: x.find_elements(By.TAG_NAME, "iframe"))
+        driver.switch_to.frame(iframes[3])
+        WebDriverWait(driver, 10).until(lambda x: EC.text_to_be_present_in_element(x, 'Values displayed are in millions.'))
+        element = driver.find_element(By.XPATH, '//*[@id="layout-full"]/div[4]/div/div')
+        WebDriverWait(driver, 10).until(lambda x: EC.visibility_of_element_located(element))
+        report_sources[name] = driver.page_source
+        if page_cache is not None:
+            htmls += container_html(driver, ['div[data-module-name="FinancialStatementModule"]'])
+
+    # Reuse the parsed frames if the pages are unchanged
+    if page_cache is not None:
+        key = page_cache.key(ticker, 'fundies', htmls)
+        cached = page_cache.get('fundies', key)
+        if cached is not None:
+            return cached
+
     # Make soup
-    soup = BeautifulSoup(driver.page_source, 'html.parser')
+    soup = BeautifulSoup(overview_source, 'html.parser')
 
     # Scrapes current valuation ratios
     contain = soup.find('div', {'class': 'ui-description-list'})
@@ -664,33 +845,9 @@ def scrape_fundamentals(driver, ticker, search_first=True, internet_speed='fast'
     # Make df of Historic Growth and Share Detail
     fundies2 = dict(zip(labels, values))
 
-    # Get ready to scrape financial reports:
-    report_names = ['Balance Sheet',
-              'Income Statement',
-              'Cash Flow'
-             ]
-    xpaths = [#'//*[@id="layout-full"]/div[4]/nav/nav/a[1]', # Already done
-              '//*[@id="layout-full"]/div[4]/nav/nav/a[2]',
-              '//*[@id="layout-full"]/div[4]/nav/nav/a[3]',
-              '//*[@id="layout-full"]/div[4]/nav/nav/a[4]'
-             ]
-    reports = dict(zip(report_names, xpaths))
-    
     # Function to scrape each report, since their formats are similar enough
-    def scrape_report(name, xpath):
-        # Switch to Appropriate Report
-        driver.find_element(By.XPATH, xpath).click()
-        time.sleep(sleep_time)
-        iframes = WebDriverWait(driver, 10).until(lambda x: x.find_elements(By.TAG_NAME, "iframe"))
-        driver.switch_to.frame(iframes[3])
-        driver.switch_to.default_content()
-        iframes = WebDriverWait(driver, 10).until(lambda x: x.find_elements(By.TAG_NAME, "iframe"))
-        driver.switch_to.frame(iframes[3])
-        WebDriverWait(driver, 10).until(lambda x: EC.text_to_be_present_in_element(x, 'Values displayed are in millions.'))
-        element = driver.find_element(By.XPATH, '//*[@id="layout-full"]/div[4]/div/div')
-        WebDriverWait(driver, 10).until(lambda x: EC.visibility_of_element_located(element))
-
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
+    def scrape_report(name, source):
+        soup = BeautifulSoup(source, 'html.parser')
         #pprint.pprint(soup)
         contain = soup.find('div', {'data-module-name':'FinancialStatementModule'})
         year_info = [x.get_text('|') for x in contain.find_all('th', {'scope':'col'})]
@@ -735,8 +892,8 @@ def scrape_fundamentals(driver, ticker, search_first=True, internet_speed='fast'
 
     # Create yearly dataframe
     yearly = pd.DataFrame.from_dict(past_dict, orient='index').T
-    for name, xpath in reports.items():
-        tempy = scrape_report(name, xpath)
+    for name, source in report_sources.items():
+        tempy = scrape_report(name, source)
         yearly = pd.concat([yearly, tempy], axis=0, sort=False)
     
     # Combine two summary dataframes
@@ -776,9 +933,13 @@ def scrape_fundamentals(driver, ticker, search_first=True, internet_speed='fast'
     temp = temp.T
     yearly = yearly.T
 
+    if page_cache is not None:
+        page_cache.put(key, (temp.copy(), yearly.copy()))
+
     return temp, yearly
 
-def scrape_valuation(driver, ticker, search_first=True, internet_speed='fast'):
+def scrape_valuation(driver, ticker, search_first=True, internet_speed='fast',
+                     page_cache=None):
     """
     This function scrapes the "Valuation" tab of a TD Ameritrade security
     lookup page
@@ -790,6 +951,8 @@ def scrape_valuation(driver, ticker, search_first=True, internet_speed='fast'):
                                 desired security, or the wrong data will scrape
     :param internet_speed: (str) set to 'slow' if bot is not working properly due
                                 to slow page loading times.
+    :param page_cache: (PageCache) reuse previously parsed frames when the pages
+                                   are unchanged
     """
     # Search symbol first if flag is True
     if search_first:
@@ -835,8 +998,9 @@ def scrape_valuation(driver, ticker, search_first=True, internet_speed='fast'):
              ]
     tabs = dict(zip(tab_names, xpaths))
 
-    # Scrape each tab
-    valuation_df = pd.DataFrame()
+    # Load each tab, keeping its page source to be parsed later
+    tab_sources = {}
+    htmls = []
     for name, xpath in tabs.items():
         # Switch to Appropriate Report
         driver.find_element(By.XPATH, xpath).click()
@@ -855,9 +1019,22 @@ def scrape_valuation(driver, ticker, search_first=True, internet_speed='fast'):
             WebDriverWait(driver, 10).until(lambda x: EC.visibility_of_element_located(element))
         except:
             continue
+        tab_sources[name] = driver.page_source
+        if page_cache is not None:
+            htmls += [name] + container_html(driver, ['div[data-module-name="StocksValuationModule"]'])
 
+    # Reuse the parsed frame if the pages are unchanged
+    if page_cache is not None:
+        key = page_cache.key(ticker, 'valuation', htmls)
+        cached = page_cache.get('valuation', key)
+        if cached is not None:
+            return cached
+
+    # Scrape each tab
+    valuation_df = pd.DataFrame()
+    for name, source in tab_sources.items():
         # Make soup and find container
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
+        soup = BeautifulSoup(source, 'html.parser')
         contain = soup.find('div', {'data-module-name':'StocksValuationModule'})
         
         # Get data
@@ -885,10 +1062,14 @@ def scrape_valuation(driver, ticker, search_first=True, internet_speed='fast'):
 
     # Create ratio to industry feature for normalized feature
     valuation_df['Ratio to Industry'] = valuation_df[ticker] / valuation_df['Industry']
+
+    if page_cache is not None:
+        page_cache.put(key, valuation_df.copy())
     
     return valuation_df
 
-def scrape_analysts(driver, ticker, search_first=True, internet_speed='fast'):
+def scrape_analysts(driver, ticker, search_first=True, internet_speed='fast',
+                    page_cache=None):
     """
     This function scrapes the "Analyst Reports" tab of a TD Ameritrade security
     lookup page
@@ -900,6 +1081,8 @@ def scrape_analysts(driver, ticker, search_first=True, internet_speed='fast'):
                                 desired security, or the wrong data will scrape
     :param internet_speed: (str) set to 'slow' if bot is not working properly due
                                 to slow page loading times.
+    :param page_cache: (PageCache) reuse previously parsed frames when the page
+                                   is unchanged
     """
     # Search symbol first if flag is True
     if search_first:
@@ -928,6 +1111,13 @@ def scrape_analysts(driver, ticker, search_first=True, internet_speed='fast'):
     driver.switch_to.frame(iframes[3])
     WebDriverWait(driver, 10).until(lambda x: EC.text_to_be_present_in_element(x, 'Archived Reports'))
 
+    # Reuse the parsed frame if the page is unchanged
+    if page_cache is not None:
+        key = page_cache.key(ticker, 'analysts', container_html(driver, ['table.provider-table']))
+        cached = page_cache.get('analysts', key)
+        if cached is not None:
+            return cached
+
     # Make soup and find container and elements
     soup = BeautifulSoup(driver.page_source, 'html.parser')
     contain = soup.find('table', {'class':'ui-table provider-table'}).find('tbody')
@@ -1000,10 +1190,284 @@ def scrape_analysts(driver, ticker, search_first=True, internet_speed='fast'):
                                   )
     # Convert date column to datetime
     temp['Rating Since'] = pd.to_datetime(temp['Rating Since'], infer_datetime_format=True)
+
+    if page_cache is not None:
+        page_cache.put(key, temp.copy())
     
     return temp
 
-def scrape_ticker(driver, ticker, errors='ignore', internet_speed='fast'):
+# Tabs scraped by scrape_ticker(), named as in its results
+TAB_NAMES = ['summary', 'earnings', 'fundies', 'valuation', 'analysts']
+
+# Rows each tab contributes to the combined df for any security of the
+# nmr_us_11-27-2022 snapshot, used to keep the combined rows lined up when a
+# tab is skipped or comes back empty
+TAB_FIELDS = {'summary': ['% Above Low', '% Below High', '% Held by Institutions', '52-Wk Range',
+                          'Annual Dividend $', 'Annual Dividend %', 'Ask', 'Ask Size', 'Ask close',
+                          'B/A Ratio', 'B/A Size', 'Beta', 'Bid', 'Bid Size', 'Bid close',
+                          'Change Since Close', 'Closing Price', 'Day Change $', 'Day Change %',
+                          'Day High', 'Day Low', 'Dividend Pay Date', 'EPS (TTM, GAAP)',
+                          'Ex-dividend', 'Ex-dividend Date', 'Historical Volatility', 'Last (size)',
+                          'Last (time)', 'Last Trade', 'Market Cap', 'Market Edge Opinion:',
+                          'P/E Ratio (TTM, GAAP)', 'Prev Close', 'Price', 'Short Interest',
+                          "Today's Open", 'Volume', 'Volume 10-day Avg', 'Volume Past Day'
+                         ],
+              'earnings': ['Next Earnings Announcement', 'Growth Analysts',
+                           'Growth 1yr Low Est', 'Growth 1yr High Est', 'Growth 1yr Consensus Est',
+                           'Growth 2yr Low Est', 'Growth 2yr High Est', 'Growth 2yr Consensus Est',
+                           'Growth 5yr Low Est', 'Growth 5yr High Est', 'Growth 5yr Consensus Est',
+                           'Growth 5yr Actual/Est', 'Growth 3yr Historic'
+                          ],
+              'fundies': ['Price/Earnings (TTM)', 'Price/Sales (TTM)', 'Price/Book (MRQ)',
+                          'Price/Cash Flow (TTM)', '5yr Low', '5yr High', '5yr Avg Return',
+                          'EPS Growth 5yr', 'Revenue Growth 5yr', 'Dividend Growth 5yr',
+                          'Short Int Current Month', 'Short Int Prev Month', 'Short Int Pct of Float',
+                          'Days to Cover', 'Float', 'Institutions Holding Shares',
+                          'Shares Outstanding', '% Held by Institutions', 'FCF Growth 5yr'
+                         ],
+              'valuation': ['Price/Earnings (TTM, GAAP)', 'Price/Sales (TTM)', 'Price/Book (MRQ)',
+                            'PEG Ratio (TTM, GAAP)', 'Gross Profit Margin (TTM)',
+                            'Operating Profit Margin (TTM)', 'Net Profit Margin (TTM)',
+                            'Annual Dividend Yield', 'Dividend Change %', 'Dividend Growth Rate, 3 Years',
+                            'EPS Growth (MRQ)', 'EPS Growth (TTM)', 'Revenue Growth (MRQ)',
+                            'Revenue Growth (TTM)', 'Return On Equity (TTM)', 'Return On Assets (TTM)',
+                            'Return On Investment (TTM)', 'Revenue Per Employee (TTM)',
+                            'Total Debt/Total Capital (MRQ)',
+                            'Change in Debt/Total Capital Quarter over Quarter',
+                            'Interest Coverage (MRQ)', 'Quick Ratio (MRQ)'
+                           ],
+              'analysts': ['newConstructs', 'researchTeam', 'cfra', 'ford', 'theStreet',
+                           'marketEdge opinion', 'marketEdge'
+                          ]
+             }
+
+class TabPlan:
+    """
+    Learns which tabs return data for each security, so that tabs which will be
+    empty (the earnings, statements and analysts of ETFs and new listings) are
+    skipped instead of timing out through every retry. A tab is skipped once it
+    has come back empty `patience` times in a row, and is tried again after
+    every `recheck` skips in case coverage has started.
+    :param path: (str) .json file the plan is loaded from and saved to, kept in
+                       memory only if None
+    :param patience: (int) empty scrapes in a row before a tab is skipped
+    :param recheck: (int) skips after which a skipped tab is tried again
+    """
+    def __init__(self, path=None, patience=2, recheck=10):
+        self.path = path
+        self.patience = patience
+        self.recheck = recheck
+        self.plans = {}
+        if path is not None and os.path.isfile(path):
+            with open(path) as f:
+                self.plans = json.load(f)
+
+    def tabs_for(self, ticker, tabs=None):
+        """
+        This function returns the tabs worth scraping for a ticker.
+        :param ticker: (str) ticker symbol to scrape
+        :param tabs: (list) tabs wanted, all of TAB_NAMES if None
+        """
+        if tabs is None:
+            tabs = TAB_NAMES
+        plan = self.plans.get(ticker, {})
+        keep = []
+        for tab in tabs:
+            state = plan.get(tab)
+            if state is None or state['empty'] < self.patience:
+                keep.append(tab)
+                continue
+            state['skipped'] += 1
+            if state['skipped'] >= self.recheck:
+                state['skipped'] = 0
+                keep.append(tab)
+        return keep
+
+    def record(self, ticker, tab, has_data):
+        """
+        This function records whether a scraped tab returned data.
+        :param ticker: (str) ticker symbol scraped
+        :param tab: (str) name of the tab
+        :param has_data: (bool) whether the tab returned data
+        """
+        state = self.plans.setdefault(ticker, {}).setdefault(tab, {'empty': 0, 'skipped': 0})
+        if has_data:
+            state['empty'] = 0
+        else:
+            state['empty'] += 1
+
+    def save(self):
+        """
+        This function saves the plan to its .json file.
+        """
+        if self.path is not None:
+            with open(self.path, 'w') as f:
+                json.dump(self.plans, f)
+
+class StepProfiler:
+    """
+    Times every tab scrape and post-processing step, and keeps evidence of the
+    slow ones. A step that runs longer than the `percentile` of the earlier
+    runs of the same step is sampled: a watchdog starts taking stack samples
+    of the scraping thread once the threshold passes, so steps that finish in
+    time cost two clock reads and a timer. The samples (as folded stacks), the
+    page source of the driver and, in 'cprofile' mode, a cProfile profile are
+    saved under path. Every step is logged with its wall and CPU seconds, which
+    tells waiting on the browser apart from Python work.
+    :param path: (str) directory to save the captures to
+    :param percentile: (float) percentile of a step's earlier durations above
+                               which it is captured
+    :param min_samples: (int) earlier runs of a step needed before it can be captured
+    :param min_seconds: (float) shortest step duration ever captured
+    :param interval: (float) seconds between stack samples
+    :param mode: (str) 'sample' to sample stacks of slow steps only, or 'cprofile'
+                       to run cProfile on every step and keep the slow ones,
+                       which is slower but counts every call
+    """
+    def __init__(self, path, percentile=95, min_samples=20, min_seconds=5.0,
+                 interval=0.01, mode='sample'):
+        if mode not in ['sample', 'cprofile']:
+            raise ValueError("mode must be 'sample' or 'cprofile'")
+        self.path = path
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_seconds = min_seconds
+        self.interval = interval
+        self.mode = mode
+        self.durations = {}
+        self.log = []
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def threshold(self, step):
+        """
+        This function returns the duration above which a step is captured, or
+        None while the step has too few earlier runs.
+        :param step: (str) name of the step, such as 'fundies'
+        """
+        durations = self.durations.get(step, [])
+        if len(durations) < self.min_samples:
+            return None
+        return max(np.percentile(durations, self.percentile), self.min_seconds)
+
+    def _sample(self, thread_id, stacks, stop):
+        """
+        This function counts the stacks of a thread every interval until stopped.
+        """
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append('{}:{}:{}'.format(os.path.basename(code.co_filename),
+                                               code.co_name, frame.f_lineno))
+                frame = frame.f_back
+            stack = ';'.join(reversed(stack))
+            stacks[stack] = stacks.get(stack, 0) + 1
+
+    @contextmanager
+    def profile(self, step, ticker, driver=None):
+        """
+        This function times the step run inside the with block, and captures it
+        if it runs past the threshold, as in:
+        with profiler.profile('analysts', ticker, driver):
+            ...
+        :param step: (str) name of the step, such as 'fundies'
+        :param ticker: (str) ticker symbol being scraped
+        :param driver: (Selenium webdriver) driver whose page source is saved
+        """
+        threshold = self.threshold(step)
+        stacks = {}
+        stop = threading.Event()
+        watchdog = None
+        sampler = None
+        profiler = None
+        if threshold is not None:
+            sampler = threading.Thread(target=self._sample, args=(threading.get_ident(), stacks, stop),
+                                       daemon=True)
+            watchdog = threading.Timer(threshold, sampler.start)
+            watchdog.daemon = True
+            watchdog.start()
+            if self.mode == 'cprofile':
+                profiler = cProfile.Profile()
+                profiler.enable()
+        error = None
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            cpu_seconds = time.thread_time() - cpu_start
+            if profiler is not None:
+                profiler.disable()
+            if watchdog is not None:
+                watchdog.cancel()
+                watchdog.join()
+                stop.set()
+                if sampler.ident is not None:
+                    sampler.join()
+            triggered = threshold is not None and seconds > threshold
+            if triggered:
+                self._capture(step, ticker, driver, stacks, profiler)
+            self.durations.setdefault(step, []).append(seconds)
+            self.log.append({'Ticker': ticker,
+                             'Step': step,
+                             'Seconds': seconds,
+                             'CPU Seconds': cpu_seconds,
+                             'Threshold': threshold,
+                             'Triggered': triggered,
+                             'Error': error
+                            })
+
+    def _capture(self, step, ticker, driver, stacks, profiler):
+        """
+        This function saves the stack samples, profile and page source of a
+        slow step, named after the ticker, step and position in the log.
+        """
+        print("{} of {} is slow, saving a profile".format(step, ticker))
+        file_path = os.path.join(self.path, '{}_{}_{}'.format(ticker, step, len(self.log)))
+        with open(file_path + '.folded', 'w') as f:
+            for stack, count in sorted(stacks.items(), key=lambda x: -x[1]):
+                f.write('{} {}\n'.format(stack, count))
+        if profiler is not None:
+            profiler.dump_stats(file_path + '.prof')
+        if driver is not None:
+            try:
+                html = driver.page_source
+            except:
+                html = None
+            if html is not None:
+                with open(file_path + '.html', 'w', encoding='utf-8') as f:
+                    f.write(html)
+
+    def report(self):
+        """
+        This function returns a dataframe with one row per step run, holding its
+        wall and CPU seconds, the capture threshold at the time, whether it was
+        captured, and the exception it raised if any.
+        """
+        return pd.DataFrame(self.log, columns=['Ticker', 'Step', 'Seconds', 'CPU Seconds',
+                                               'Threshold', 'Triggered', 'Error'])
+
+def profile_step(profiler, step, ticker, driver=None):
+    """
+    This function returns the context of a profiled step, or a context that
+    does nothing if there is no profiler.
+    :param profiler: (StepProfiler) profiler of the run, or None
+    :param step: (str) name of the step, such as 'fundies'
+    :param ticker: (str) ticker symbol being scraped
+    :param driver: (Selenium webdriver) driver whose page source is saved
+    """
+    if profiler is None:
+        return nullcontext()
+    return profiler.profile(step, ticker, driver)
+
+def scrape_ticker(driver, ticker, errors='ignore', internet_speed='fast', page_cache=None,
+                  tabs=None, tab_plan=None, profiler=None, search_first=True):
     """
     This function scrapes every tab of a security based on ticker passed.
     Each scrape will be attempted 5 times before being skipped, as it is 
@@ -1013,19 +1477,45 @@ def scrape_ticker(driver, ticker, errors='ignore', internet_speed='fast'):
     :param ticker: (str) ticker symbol to scrape
     :param internet_speed: (str) set to 'slow' if bot is not working properly due
                                 to slow page loading times.
+    :param page_cache: (PageCache) reuse previously parsed fundamentals, valuation
+                                   and analysts frames when their pages are unchanged
+    :param tabs: (list) tabs to scrape out of TAB_NAMES, all of them if None. The
+                        results of the other tabs are empty dataframes
+    :param tab_plan: (TabPlan) skip tabs that have been empty for this security,
+                               and record which tabs return data. Tabs that fail
+                               every attempt are not recorded
+    :param profiler: (StepProfiler) time each tab attempt and the combining step,
+                                    and capture the slow ones
+    :param search_first: (bool) search for the symbol before the first tab. Set
+                                to False if the driver is already on the security.
+                                Attempts after a failure always search again
     """
+    if tabs is None:
+        tabs = TAB_NAMES
+    if tab_plan is not None:
+        tabs = tab_plan.tabs_for(ticker, tabs)
+    # The first tab scraped searches for the symbol
+    # Tabs that failed every attempt, which says nothing about their coverage
+    failed = []
+
     # Getting Summary
-    success = False
+    summary = pd.DataFrame(columns=[ticker])
+    success = 'summary' not in tabs
     tries = 0
     while not success:
         tries += 1
         try:
-            summary = scrape_summary(driver, ticker, internet_speed=internet_speed)
+            with profile_step(profiler, 'summary', ticker, driver):
+                summary = scrape_summary(driver, ticker, search_first=search_first, internet_speed=internet_speed)
+            search_first = False
             success = True
         except:
             print("Failed to gather summary for {} on attempt {}".format(ticker, tries))
+            # The page may be wrong or unloaded, search again on the next attempt
+            search_first = True
         if tries >= 5:    
             print("Too many failed attempts for summary of {}, skipping to next df.".format(ticker))
+            failed.append('summary')
             summary = pd.DataFrame(columns=[ticker])
             if errors == 'raise':
                 raise
@@ -1033,17 +1523,23 @@ def scrape_ticker(driver, ticker, errors='ignore', internet_speed='fast'):
                 break
 
     # Getting Earnings
-    success = False
+    earnings = pd.DataFrame(columns=[ticker])
+    earnings_yearly = pd.DataFrame(columns=[ticker])
+    success = 'earnings' not in tabs
     tries = 0
     while not success:
         tries += 1
         try:
-            earnings, earnings_yearly = scrape_earnings(driver, ticker, search_first=False, internet_speed=internet_speed)
+            with profile_step(profiler, 'earnings', ticker, driver):
+                earnings, earnings_yearly = scrape_earnings(driver, ticker, search_first=search_first, internet_speed=internet_speed)
+            search_first = False
             success = True
         except:
             print("Failed to gather earnings for {} on attempt {}".format(ticker, tries))
+            search_first = True
         if tries >= 5:
             print("Too many failed attempts for earnings of {}, skipping to next df.".format(ticker))
+            failed.append('earnings')
             earnings = pd.DataFrame(columns=[ticker])
             earnings_yearly = pd.DataFrame(columns=[ticker])
             if errors == 'raise':
@@ -1052,17 +1548,24 @@ def scrape_ticker(driver, ticker, errors='ignore', internet_speed='fast'):
                 break
     
     # Getting fundamentals
-    success = False
+    fundies = pd.DataFrame(columns=[ticker])
+    fundies_yearly = pd.DataFrame(columns=[ticker])
+    success = 'fundies' not in tabs
     tries = 0
     while not success:
         tries += 1
         try:
-            fundies, fundies_yearly = scrape_fundamentals(driver, ticker, search_first=False, internet_speed=internet_speed)
+            with profile_step(profiler, 'fundies', ticker, driver):
+                fundies, fundies_yearly = scrape_fundamentals(driver, ticker, search_first=search_first, internet_speed=internet_speed,
+                                                             page_cache=page_cache)
+            search_first = False
             success = True
         except:
             print("Failed to gather fundamentals for {} on attempt {}".format(ticker, tries))
+            search_first = True
         if tries >= 5:
             print("Too many failed attempts for fundamentals of {}, skipping to next df.".format(ticker))
+            failed.append('fundies')
             fundies = pd.DataFrame(columns=[ticker])
             fundies_yearly = pd.DataFrame(columns=[ticker])
             if errors == 'raise':
@@ -1071,17 +1574,23 @@ def scrape_ticker(driver, ticker, errors='ignore', internet_speed='fast'):
                 break
 
     # Getting valuation
-    success = False
+    valuation = pd.DataFrame(columns=[ticker])
+    success = 'valuation' not in tabs
     tries = 0
     while not success:
         tries += 1
         try:
-            valuation = scrape_valuation(driver, ticker, search_first=False, internet_speed=internet_speed)
+            with profile_step(profiler, 'valuation', ticker, driver):
+                valuation = scrape_valuation(driver, ticker, search_first=search_first, internet_speed=internet_speed,
+                                             page_cache=page_cache)
+            search_first = False
             success = True
         except:
             print("Failed to gather valuation for {} on attempt {}".format(ticker, tries))
+            search_first = True
         if tries >= 5:
             print("Too many failed attempts for valuation of {}, skipping to next df.".format(ticker))
+            failed.append('valuation')
             valuation = pd.DataFrame(columns=[ticker])
             if errors == 'raise':
                 raise
@@ -1089,50 +1598,365 @@ def scrape_ticker(driver, ticker, errors='ignore', internet_speed='fast'):
                 break
     
     # Getting analyst reports
-    success = False
+    analysis = pd.DataFrame(columns=[ticker])
+    success = 'analysts' not in tabs
     tries = 0
     while not success:
         tries += 1
         try:
-            analysis = scrape_analysts(driver, ticker, search_first=False, internet_speed=internet_speed)
+            with profile_step(profiler, 'analysts', ticker, driver):
+                analysis = scrape_analysts(driver, ticker, search_first=search_first, internet_speed=internet_speed,
+                                           page_cache=page_cache)
+            search_first = False
             success = True
         except:
             print("Failed to gather analysts for {} on attempt {}".format(ticker, tries))
+            search_first = True
         if tries >= 5:
             print("Too many failed attempts for analysts of {}, skipping to next df.".format(ticker))
+            failed.append('analysts')
             analysis = pd.DataFrame(columns=[ticker])
             if errors == 'raise':
                 raise
             elif errors == 'ignore':
                 break
     
-    # Create combined 1D df for later stacking
-    combined = pd.concat([summary[ticker].drop(index=['Shares Outstanding']),
-                          earnings[ticker],
-                          fundies[ticker],
-                          valuation[ticker],
-                          analysis[ticker]
-                         ],
-                        axis=0)
-    # Remove duplicate rows from combined
-    combined = pd.DataFrame(combined.loc[~combined.index.duplicated(keep='first')])
-    for analyst in analysis.index:
-        combined.loc[analyst+' since'] = analysis.loc[analyst, 'Rating Since']
-    # Produce dictionary of results
-    results = {'combined':combined, 
-               'summary':summary, 
-               'earnings':earnings, 
-               'earnings_yearly':earnings_yearly, 
-               'fundies':fundies, 
-               'fundies_yearly':fundies_yearly, 
-               'valuation':valuation,
-               'analysts':analysis
-              }
+    with profile_step(profiler, 'combine', ticker):
+        # Create combined 1D df for later stacking
+        combined = pd.concat([summary[ticker].drop(index=['Shares Outstanding'], errors='ignore'),
+                              earnings[ticker],
+                              fundies[ticker],
+                              valuation[ticker],
+                              analysis[ticker]
+                             ],
+                            axis=0)
+        # Remove duplicate rows from combined
+        combined = pd.DataFrame(combined.loc[~combined.index.duplicated(keep='first')])
+        for analyst in analysis.index:
+            combined.loc[analyst+' since'] = analysis.loc[analyst, 'Rating Since']
+        # Produce dictionary of results
+        results = {'combined':combined, 
+                   'summary':summary, 
+                   'earnings':earnings, 
+                   'earnings_yearly':earnings_yearly, 
+                   'fundies':fundies, 
+                   'fundies_yearly':fundies_yearly, 
+                   'valuation':valuation,
+                   'analysts':analysis
+                  }
+
+        # Keep the usual rows of skipped or empty tabs so combined rows line up
+        for tab in TAB_NAMES:
+            if results[tab].empty:
+                fields = TAB_FIELDS[tab]
+                if tab == 'analysts':
+                    fields = fields + [analyst+' since' for analyst in fields]
+                missing = [field for field in fields if field not in combined.index]
+                combined = pd.concat([combined, pd.DataFrame(np.NaN, index=missing, columns=combined.columns)], axis=0)
+        results['combined'] = combined
+    if tab_plan is not None:
+        for tab in tabs:
+            if tab not in failed:
+                tab_plan.record(ticker, tab, not results[tab].empty)
+
     return results
 
+class DriverSupervisor:
+    """
+    Keeps a logged in webdriver healthy over long runs. The driver is quit and
+    restarted (and logged in again) after a set number of tickers, when the
+    memory of the browser processes crosses a threshold, when page latency
+    trends upward, or when the driver crashes. Every scraped ticker is logged
+    so that the latency and memory curve of a full run can be reported.
+    :param keys: (dict) dictionary with username ("user") and password ("pass")
+    :param max_tickers: (int) restart the driver after this many tickers, or
+                              never if None
+    :param max_rss_mb: (float) restart the driver when chromedriver and its
+                               browser processes use more memory than this
+                               (requires psutil), or never if None
+    :param latency_factor: (float) restart the driver when the median scrape time
+                                   of the last `window` tickers exceeds the median
+                                   of the first `window` tickers after the last
+                                   restart by this factor, or never if None
+    :param window: (int) number of tickers used for the latency medians
+    :param driver: (Selenium webdriver) already running driver to supervise, a
+                                        new one is started if None
+    """
+    def __init__(self, keys, max_tickers=250, max_rss_mb=None, latency_factor=2.0,
+                 window=20, driver=None):
+        self.keys = keys
+        self.max_tickers = max_tickers
+        self.max_rss_mb = max_rss_mb
+        self.latency_factor = latency_factor
+        self.window = window
+        self.driver = driver if driver is not None else start_bot(keys)
+        self.restarts = 0
+        self.log = []
+        self._latencies = []
+        self._restart_reason = None
+
+    def rss_mb(self):
+        """
+        This function returns the resident memory in MB of chromedriver and all
+        of the browser processes it spawned, or NaN if it can't be measured.
+        """
+        if psutil is None:
+            return np.NaN
+        try:
+            proc = psutil.Process(self.driver.service.process.pid)
+            procs = [proc] + proc.children(recursive=True)
+        except:
+            return np.NaN
+        rss = 0
+        for p in procs:
+            try:
+                rss += p.memory_info().rss
+            except psutil.Error:
+                continue
+        return rss / 1024**2
+
+    def is_alive(self):
+        """
+        This function checks whether the driver still responds.
+        """
+        try:
+            self.driver.current_url
+        except:
+            return False
+        return True
+
+    def restart(self, reason):
+        """
+        This function quits the current driver and replaces it with a freshly
+        logged in one.
+        :param reason: (str) why the driver is restarted, recorded in the log
+        """
+        print("Restarting driver ({})".format(reason))
+        try:
+            self.driver.quit()
+        except:
+            pass
+        self.driver = start_bot(self.keys)
+        self.restarts += 1
+        self._latencies = []
+        self._restart_reason = reason
+
+    def recycle_reason(self):
+        """
+        This function returns the reason the driver should be recycled before the
+        next ticker, or None if it is still healthy.
+        """
+        if self.max_tickers is not None and len(self._latencies) >= self.max_tickers:
+            return 'ticker limit'
+        if self.max_rss_mb is not None and self.log and self.log[-1]['RSS MB'] > self.max_rss_mb:
+            return 'memory limit'
+        if self.latency_factor is not None and len(self._latencies) >= 2 * self.window:
+            baseline = np.median(self._latencies[:self.window])
+            recent = np.median(self._latencies[-self.window:])
+            if recent > self.latency_factor * baseline:
+                return 'latency trend'
+        return None
+
+    def scrape(self, ticker, **kwargs):
+        """
+        This function scrapes a ticker with scrape_ticker() using the supervised
+        driver, recycling the driver beforehand if needed. If the driver crashes
+        during the scrape it is restarted and the same ticker is scraped again.
+        :param ticker: (str) ticker symbol to scrape
+        :param kwargs: keyword arguments passed on to scrape_ticker()
+        """
+        reason = self.recycle_reason()
+        if reason is not None:
+            self.restart(reason)
+
+        start = time.time()
+        try:
+            results = scrape_ticker(self.driver, ticker, **kwargs)
+        except:
+            if self.is_alive():
+                raise
+            results = None
+        # Failed tabs are swallowed by scrape_ticker, so check the driver as well
+        if results is None or not self.is_alive():
+            self.restart('crash')
+            start = time.time()
+            results = scrape_ticker(self.driver, ticker, **kwargs)
+        seconds = time.time() - start
+
+        self._latencies.append(seconds)
+        self.log.append({'Ticker': ticker,
+                         'Seconds': seconds,
+                         'RSS MB': self.rss_mb(),
+                         'Driver Age': len(self._latencies),
+                         'Restart': self._restart_reason
+                        })
+        self._restart_reason = None
+        return results
+
+    def report(self):
+        """
+        This function returns a dataframe with one row per scraped ticker, holding
+        the scrape time, the browser memory after the scrape, the number of
+        tickers since the last restart, and the reason for any restart made just
+        before it. Plotting 'Seconds' and 'RSS MB' gives the curves of the run.
+        """
+        return pd.DataFrame(self.log, columns=['Ticker', 'Seconds', 'RSS MB', 'Driver Age', 'Restart'])
+
+def shows_symbol(text, ticker):
+    """
+    This function checks whether a ticker symbol appears as a whole word in
+    the text of a page, such as its title and headers.
+    :param text: (str) page text
+    :param ticker: (str) ticker symbol
+    """
+    pattern = r'(?<![A-Za-z0-9.]){}(?![A-Za-z0-9])'.format(re.escape(ticker))
+    return re.search(pattern, text or '') is not None
+
+class TabPool:
+    """
+    Hides the page loads of a watchlist behind each other using several
+    browser tabs of one logged in driver, so no extra driver has to be started
+    or logged in. While a ticker is scraped in one tab, the symbol searches of
+    the next tickers are already loading in the others, and each ticker is
+    scraped as soon as its tab has loaded. Tickers are scraped in the order
+    asked for, so the combined rows keep their order.
+    :param driver: (Selenium webdriver) logged in webdriver returned from start_bot()
+    :param n_windows: (int) number of browser tabs to use
+    :param min_wait: (float) seconds after a search before its tab is checked
+    :param timeout: (float) most seconds to wait for a tab to load
+    """
+    def __init__(self, driver, n_windows=3, min_wait=1.0, timeout=20):
+        self.driver = driver
+        self.n_windows = n_windows
+        self.min_wait = min_wait
+        self.timeout = timeout
+        self.url = driver.current_url
+        self.handles = [driver.current_window_handle]
+        self.loading = {}
+        self.started = {}
+
+    def _free_handle(self):
+        """
+        This function returns a tab not loading any ticker, opening a new one if
+        the pool is not full, or None.
+        """
+        busy = set(self.loading.values())
+        for handle in self.handles:
+            if handle not in busy:
+                return handle
+        if len(self.handles) < self.n_windows:
+            self.driver.switch_to.new_window('tab')
+            self.driver.get(self.url)
+            self.handles.append(self.driver.current_window_handle)
+            return self.handles[-1]
+        return None
+
+    def start(self, ticker):
+        """
+        This function starts the symbol search of a ticker in a free tab
+        without waiting for the page. Returns False if every tab is busy.
+        :param ticker: (str) ticker symbol to load
+        """
+        if ticker in self.loading:
+            return True
+        handle = self._free_handle()
+        if handle is None:
+            return False
+        self.driver.switch_to.window(handle)
+        self._mark_stale()
+        search_symbol(self.driver, ticker, wait=0)
+        self.loading[ticker] = handle
+        self.started[ticker] = time.time()
+        return True
+
+    def _mark_stale(self):
+        """
+        This function marks the page of the current tab and its quote iframe as
+        stale before a search, so is_ready() can tell the new page from the one
+        it replaces. Leaves the driver in the quote iframe, where the symbol
+        lookup is.
+        """
+        self.driver.switch_to.default_content()
+        self.driver.execute_script('window.tabPoolStale = true')
+        iframes = self.driver.find_elements(By.TAG_NAME, 'iframe')
+        if len(iframes) > 3:
+            self.driver.switch_to.frame(iframes[3])
+            self.driver.execute_script('window.tabPoolStale = true')
+
+    def is_ready(self, ticker):
+        """
+        This function checks, without waiting, whether the page of a ticker has
+        loaded far enough to be scraped: the quote iframe must be a new page
+        since the search, fully loaded, and show the ticker in its title or
+        headers.
+        :param ticker: (str) ticker symbol being loaded
+        """
+        if time.time() - self.started[ticker] < self.min_wait:
+            return False
+        self.driver.switch_to.window(self.loading[ticker])
+        self.driver.switch_to.default_content()
+        try:
+            state = self.driver.execute_script('return document.readyState')
+            iframes = self.driver.find_elements(By.TAG_NAME, 'iframe')
+            if state != 'complete' or len(iframes) <= 3:
+                return False
+            self.driver.switch_to.frame(iframes[3])
+            stale, frame_state, header = self.driver.execute_script(
+                "return [window.tabPoolStale === true, document.readyState, "
+                "[document.title].concat(Array.from(document.querySelectorAll('h1, h2, h3'))"
+                ".map(function (e) { return e.textContent; })).join(' ')]")
+        except:
+            return False
+        finally:
+            self.driver.switch_to.default_content()
+        return not stale and frame_state == 'complete' and shows_symbol(header, ticker)
+
+    def scrape(self, ticker, upcoming=(), **kwargs):
+        """
+        This function scrapes a ticker with scrape_ticker() in its tab, after
+        starting the searches of the upcoming tickers in the free tabs.
+        :param ticker: (str) ticker symbol to scrape
+        :param upcoming: (list) tickers to be scraped next, in order
+        :param kwargs: keyword arguments passed on to scrape_ticker()
+        """
+        for symbol in [ticker] + list(upcoming):
+            if not self.start(symbol):
+                break
+        ready = self.is_ready(ticker)
+        while not ready and time.time() - self.started[ticker] < self.timeout:
+            time.sleep(0.1)
+            ready = self.is_ready(ticker)
+        if not ready:
+            print("Tab of {} did not load {} in time, searching again".format(ticker, ticker))
+        self.driver.switch_to.window(self.loading[ticker])
+        try:
+            # A tab that never showed the ticker is searched again
+            return scrape_ticker(self.driver, ticker, search_first=not ready, **kwargs)
+        finally:
+            # The tab is free for the next search either way
+            del self.loading[ticker]
+            del self.started[ticker]
+
+    def close(self):
+        """
+        This function closes the extra tabs and switches back to the first one.
+        """
+        for handle in self.handles[1:]:
+            try:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+            except:
+                pass
+        self.handles = self.handles[:1]
+        self.loading = {}
+        self.started = {}
+        self.driver.switch_to.window(self.handles[0])
+
 def scrape_watchlist(driver, tickers, name, root_dir='', skip_finished=True,
                      save_df=False, errors='ignore', return_skipped=False,
-                     internet_speed='fast'):
+                     internet_speed='fast', supervisor=None, page_cache=None,
+                     tabs=None, tab_plan=None, schema=None, profiler=None, date=None,
+                     progress=None, pool=None):
     """
     Main wrapper function for scraper. Can do large lists of securities,
     and will store the data into assigned directory (can be set with kwarg)
@@ -1147,19 +1971,55 @@ def scrape_watchlist(driver, tickers, name, root_dir='', skip_finished=True,
                             ignoring errors
     :param internet_speed: (str) set to 'slow' if bot is not working properly due
                             to slow page loading times.
+    :param supervisor: (DriverSupervisor) scrape through this supervisor instead
+                            of driver, so the driver is recycled as needed. Its
+                            report is saved as supervisor_report.csv
+    :param page_cache: (PageCache) reuse previously parsed frames of unchanged
+                            pages. Page hashes are saved as page_hashes.json for
+                            each ticker, and hit rates as page_cache_report.csv
+    :param tabs: (list) tabs to scrape out of TAB_NAMES, all of them if None
+    :param tab_plan: (TabPlan) skip tabs that have been empty for a security. The
+                            plan is saved every 10 tickers and at the end
+    :param schema: (Schema) assemble big_df with this tdschema schema at the end,
+                            instead of growing the sorted union of fields
+    :param profiler: (StepProfiler) time every tab, combining and saving step, and
+                            capture the slow ones. Its report is saved as
+                            profile_report.csv
+    :param date: (datetime) date the snapshot directory is named after, today if
+                            None. Pass the session date so a run that crosses
+                            midnight, or is resumed the next day, stays in one
+                            snapshot
+    :param progress: (function) called as progress(tickers_done, n_tickers, ticker,
+                            tickers_scraped=, tickers_skipped=, tickers_failed=)
+                            after each ticker, whether it was scraped, skipped
+                            as finished or failed, such as ScrapeService.update()
+    :param pool: (TabPool) scrape through the tabs of this pool, loading the next
+                            tickers while one is scraped. Can't be used with a
+                            supervisor
     """
+    if pool is not None and supervisor is not None:
+        raise ValueError("Use either a supervisor or a pool")
     # Make list for skipped securities if needed
     if return_skipped == True:
         skipped = []
 
     # Create path name based on date and watchlist name, and make directory
-    path_name = root_dir + name + '_' + datetime.today().strftime('%m-%d-%Y')
+    if date is None:
+        date = datetime.today()
+    path_name = root_dir + name + '_' + date.strftime('%m-%d-%Y')
     # path_name = root_dir + name + '_' + datetime(2022, 11, 27).strftime('%m-%d-%Y')
     if not os.path.isdir(path_name):
         os.mkdir(path_name)
     
     # Create empty dataframe
     big_df = pd.DataFrame()
+    rows = []
+    counts = {'tickers_scraped': 0, 'tickers_skipped': 0, 'tickers_failed': 0}
+
+    def report(outcome, tickers_done, ticker):
+        counts[outcome] += 1
+        if progress is not None:
+            progress(tickers_done, len(tickers), ticker, **counts)
     
     # Scrape each ticker
     for i, ticker in enumerate(tickers):
@@ -1170,11 +2030,25 @@ def scrape_watchlist(driver, tickers, name, root_dir='', skip_finished=True,
         # Skip previously scraped securities if flag is True
         if skip_finished:
             if os.path.isdir(ticker_path):
+                report('tickers_skipped', tickers_done, ticker)
                 continue
         
         # Scrape security
         try:
-            results = scrape_ticker(driver, ticker, errors=errors, internet_speed=internet_speed)
+            if supervisor is not None:
+                results = supervisor.scrape(ticker, errors=errors, internet_speed=internet_speed,
+                                            page_cache=page_cache, tabs=tabs, tab_plan=tab_plan,
+                                            profiler=profiler)
+            elif pool is not None:
+                upcoming = [symbol for symbol in tickers[i + 1:i + pool.n_windows]
+                            if not (skip_finished and os.path.isdir(path_name + '/{}'.format(symbol)))]
+                results = pool.scrape(ticker, upcoming, errors=errors, internet_speed=internet_speed,
+                                      page_cache=page_cache, tabs=tabs, tab_plan=tab_plan,
+                                      profiler=profiler)
+            else:
+                results = scrape_ticker(driver, ticker, errors=errors, internet_speed=internet_speed,
+                                        page_cache=page_cache, tabs=tabs, tab_plan=tab_plan,
+                                        profiler=profiler)
         except:
             print("Did not successfully scrape {}".format(ticker))
             if errors == 'raise':
@@ -1182,6 +2056,7 @@ def scrape_watchlist(driver, tickers, name, root_dir='', skip_finished=True,
             else:
                 if return_skipped:
                     skipped.append(ticker)
+                report('tickers_failed', tickers_done, ticker)
                 continue
         
         # Make directory if there is none
@@ -1189,48 +2064,48 @@ def scrape_watchlist(driver, tickers, name, root_dir='', skip_finished=True,
             os.mkdir(ticker_path)
         
         # Dump .csv files to directory
-        for name, dataframe in results.items():
-            try:
-                dataframe.to_csv(ticker_path + '/{}'.format(name) + '.csv')
-            except:
-                print("No {} dataframe for {}".format(name,ticker))
+        with profile_step(profiler, 'save', ticker):
+            for name, dataframe in results.items():
+                try:
+                    dataframe.to_csv(ticker_path + '/{}'.format(name) + '.csv')
+                except:
+                    print("No {} dataframe for {}".format(name,ticker))
+        if page_cache is not None:
+            with open(ticker_path + '/page_hashes.json', 'w') as f:
+                json.dump(page_cache.keys.pop(ticker, {}), f)
         
         # Compile security to big_df
-        big_df = pd.concat([big_df, results['combined'].T], axis=0, sort=True)
+        if schema is not None:
+            rows.append((ticker, results['combined'][ticker]))
+        else:
+            big_df = pd.concat([big_df, results['combined'].T], axis=0, sort=True)
         
+        report('tickers_scraped', tickers_done, ticker)
+
         # Print number of tickers completed every 10 completions
         if tickers_done % 10 == 0:
             print("{} tickers scraped".format(tickers_done))
+            if tab_plan is not None:
+                tab_plan.save()
+
+    if schema is not None:
+        big_df = schema.assemble(rows)
 
     # Saves combined dataframe to file if called
     if save_df:
         big_df.to_csv(path_name + '/{}'.format('big_df.csv'))
+    if supervisor is not None:
+        supervisor.report().to_csv(path_name + '/{}'.format('supervisor_report.csv'), index=False)
+    if tab_plan is not None:
+        tab_plan.save()
+    if profiler is not None:
+        profiler.report().to_csv(path_name + '/{}'.format('profile_report.csv'), index=False)
+    if page_cache is not None:
+        cache_report = page_cache.report()
+        cache_report.to_csv(path_name + '/{}'.format('page_cache_report.csv'))
+        print(cache_report)
     
     if not return_skipped:
         return big_df,
     else:
         return big_df, skipped
-
-def build_big_df(tickers, database_path):
-    """
-    This function reads a previously scraped watchlist database at the provided
-    path, and combines all of the 'combined.csv' files into one dataframe.
-    :param tickers: (list-like) The securities to be gathered
-    :param database_path: (str) The location of the database
-    """
-    big_df = pd.DataFrame()
-    for ticker in tickers:
-        file_path = database_path+'/{}/combined.csv'.format(ticker)
-        try:
-            temp = pd.read_csv(file_path, index_col='Unnamed: 0').T
-        except:
-            temp = pd.DataFrame(pd.read_csv(file_path)).T
-        big_df = pd.concat([big_df, temp.astype('float64',errors='ignore')], axis=0, sort=True)
-    new_df = pd.DataFrame()
-    for col in big_df:
-        new_df[col] = big_df[col].astype('float64', copy=True, errors='ignore')
-    for col in new_df.columns:
-        if col.endswith('since'):
-            new_df[col] = pd.to_datetime(new_df[col], infer_datetime_format=True)
-    
-    return new_df
\ No newline at end of file
@@ -0,0 +1,226 @@
+from joblib import Parallel, delayed, hash as joblib_hash
+import numpy as np
+import pandas as pd
+from sklearn.base import clone, is_classifier
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import ParameterGrid, ParameterSampler
+from sklearn.utils.multiclass import type_of_target
+from tdimpute import N_SPLITS, FoldCache, default_imputers, impute_fold, impute_key, make_folds
+import time
+
+def expand_candidates(models, n_candidates=None, random_state=0):
+    """
+    This function expands models and their parameter grids into candidates.
+    Returns a list of (model name, params, estimator) tuples.
+    :param models: (dict) (estimator, param grid) pairs by model name, such as
+                          {'RandomForestClassifier': (RandomForestClassifier(),
+                                                      {'max_depth': [3, 5, None]})}
+    :param n_candidates: (int) candidates sampled from each grid, the whole grid
+                               if None
+    :param random_state: (int) seed of the sampled candidates
+    """
+    candidates = []
+    seen = set()
+    for name, (estimator, grid) in models.items():
+        if n_candidates is None:
+            params_list = list(ParameterGrid(grid))
+        else:
+            params_list = list(ParameterSampler(grid, n_candidates, random_state=random_state))
+        for params in params_list:
+            # Overlapping grids can give the same candidate twice
+            key = (name, joblib_hash(sorted(params.items())))
+            if key in seen:
+                continue
+            seen.add(key)
+            candidates.append((name, params, clone(estimator).set_params(**params)))
+    return candidates
+
+def halving_schedule(n_candidates, max_resource, min_resource=1, factor=3):
+    """
+    This function returns the (candidates, resource) of each round of
+    successive halving: every round keeps the best 1/factor of the candidates
+    and gives them factor times the resource, ending with the max resource.
+    :param n_candidates: (int) candidates of the first round
+    :param max_resource: (int) resource of the last round
+    :param min_resource: (int) smallest resource of a round
+    :param factor: (int) elimination factor
+    """
+    n_rounds = 1 + int(np.ceil(np.log(max(n_candidates, 1)) / np.log(factor)))
+    schedule = []
+    for i in range(n_rounds):
+        resource = max(int(max_resource // factor ** (n_rounds - 1 - i)), min_resource, 1)
+        schedule.append((int(np.ceil(n_candidates / factor ** i)), min(resource, max_resource)))
+    return schedule
+
+def fit_candidate(estimator, X_train, X_test, y_train, y_test, scoring, resource, kind,
+                  random_state=0):
+    """
+    This function fits one candidate on one imputed fold with the given
+    resource, and returns its test score and the CPU seconds of the fit.
+    :param estimator: (estimator) unfitted candidate
+    :param X_train: (array) imputed training matrix
+    :param X_test: (array) imputed test matrix
+    :param y_train: (array) training target
+    :param y_test: (array) test target
+    :param scoring: (str) scikit-learn scorer name
+    :param resource: (int) number of training rows or of estimators
+    :param kind: (str) 'n_samples' or 'n_estimators'
+    :param random_state: (int) seed of the training row subsample
+    """
+    start = time.process_time()
+    model = clone(estimator)
+    if kind == 'n_samples':
+        if resource < len(y_train):
+            rows = np.sort(np.random.RandomState(random_state).permutation(len(y_train))[:resource])
+            X_train, y_train = X_train[rows], y_train[rows]
+    else:
+        model.set_params(n_estimators=resource)
+    try:
+        model.fit(X_train, y_train)
+        score = get_scorer(scoring)(model, X_test, y_test)
+    except ValueError:
+        # Such as a subsample with one class
+        score = np.NaN
+    return score, time.process_time() - start
+
+def halving_search(X, targets, models, scoring=None, imputer=None, scale=True, n_splits=N_SPLITS,
+                   resource='n_samples', max_resource=None, min_resource=None, factor=3,
+                   n_candidates=None, budget=None, n_jobs=-1, cache=None, random_state=0):
+    """
+    This function tunes models on each target with successive halving: all
+    candidates are cross validated with a small resource, then only the best
+    1/factor go on to the next round with factor times more, so hopeless
+    configurations are dropped after a cheap fit. Imputed folds come from a
+    FoldCache and are shared by every candidate, round and target. Classifiers
+    are tuned on binary targets, such as class1 and class2, and regressors on
+    the others, such as log_return. Returns a tidy dataframe with one row per
+    target, candidate, round and fold.
+    :param X: (DataFrame) feature matrix with NaN
+    :param targets: (DataFrame or dict) targets by name, such as make_targets()
+    :param models: (dict) (estimator, param grid) pairs by model name
+    :param scoring: (str) scikit-learn scorer name, 'roc_auc' for classifiers and
+                          'r2' for regressors if None
+    :param imputer: (estimator) unfitted imputer, mean imputation if None
+    :param scale: (bool) whether to standardize the features before imputing
+    :param n_splits: (int) number of folds
+    :param resource: (str) 'n_samples' to grow the training rows, or
+                           'n_estimators' to grow the ensembles, which then
+                           cannot be in the param grids
+    :param max_resource: (int) resource of the last round, the training rows of
+                               the smallest fold or 100 estimators if None
+    :param min_resource: (int) smallest resource of a round, 5 * n_splits rows or
+                               10 estimators if None
+    :param factor: (int) elimination factor
+    :param n_candidates: (int) candidates sampled from each grid, the whole grid
+                               if None
+    :param budget: (float) CPU seconds of fitting across every target. A round
+                           is not started if its estimated cost would go over
+                           the budget, leaving the best of the earlier round,
+                           or no limit if None
+    :param n_jobs: (int) number of processes, -1 for every CPU
+    :param cache: (FoldCache) cache of imputed fold matrices, a new in-memory
+                              cache if None
+    :param random_state: (int) seed of the sampled candidates and subsamples
+    """
+    if resource not in ['n_samples', 'n_estimators']:
+        raise ValueError("resource must be 'n_samples' or 'n_estimators'")
+    if isinstance(targets, pd.DataFrame):
+        targets = {name: targets[name] for name in targets.columns}
+    if imputer is None:
+        imputer = default_imputers()['Mean Imputation']
+    if cache is None:
+        cache = FoldCache()
+    if min_resource is None:
+        min_resource = 5 * n_splits if resource == 'n_samples' else 10
+    if resource == 'n_estimators':
+        for name, (estimator, grid) in models.items():
+            grids = grid if isinstance(grid, list) else [grid]
+            if any('n_estimators' in g for g in grids):
+                raise ValueError("n_estimators is the resource and cannot be in the grid of {}".format(name))
+    candidates = expand_candidates(models, n_candidates, random_state)
+    if resource == 'n_estimators':
+        for name, params, estimator in candidates:
+            if 'n_estimators' not in estimator.get_params():
+                raise ValueError("{} has no n_estimators to grow".format(name))
+
+    rows = []
+    cpu_seconds = 0.0
+    for target_name, y in targets.items():
+        y = y.reindex(X.index)
+        keep = y.notnull().to_numpy()
+        values = X.to_numpy(dtype='float64')[keep]
+        y = y.to_numpy()[keep]
+        classification = type_of_target(y) == 'binary'
+        pool = [(name, params, estimator) for name, params, estimator in candidates
+                if is_classifier(estimator) == classification]
+        if not pool:
+            continue
+        target_scoring = scoring or ('roc_auc' if classification else 'r2')
+
+        # Impute the folds once for every candidate and round
+        folds = make_folds(y, pool[0][2], n_splits)
+        data_key = joblib_hash(values)
+        keys = [impute_key(data_key, train, imputer, scale) for train, test in folds]
+        missing = [i for i, key in enumerate(keys) if not cache.lookup(key)]
+        matrices = Parallel(n_jobs=n_jobs)(delayed(impute_fold)(values, folds[i][0], folds[i][1], imputer, scale)
+                                           for i in missing)
+        for i, fold_matrices in zip(missing, matrices):
+            cache.put(keys[i], fold_matrices)
+
+        target_max = max_resource
+        if target_max is None:
+            target_max = min(len(train) for train, test in folds) if resource == 'n_samples' else 100
+        schedule = halving_schedule(len(pool), target_max, min_resource, factor)
+        print('{}: {} candidates in {} rounds'.format(target_name, len(pool), len(schedule)))
+
+        round_seconds = None
+        for round_number, (n_keep, round_resource) in enumerate(schedule):
+            if budget is not None and round_seconds is not None:
+                # Fitting cost grows about linearly with candidates and resource
+                previous_keep, previous_resource = schedule[round_number - 1]
+                estimate = round_seconds * n_keep / previous_keep * round_resource / previous_resource
+                if cpu_seconds + estimate > budget:
+                    print('CPU budget reached, stopping {} before round {}'.format(target_name, round_number))
+                    break
+            elif budget is not None and cpu_seconds >= budget:
+                print('CPU budget reached, skipping {}'.format(target_name))
+                break
+            pool = pool[:n_keep]
+            round_seconds = 0.0
+            tasks = [(candidate, fold) for candidate in range(len(pool)) for fold in range(len(folds))]
+            outputs = Parallel(n_jobs=n_jobs)(
+                delayed(fit_candidate)(pool[candidate][2], *cache.get(keys[fold]),
+                                       y[folds[fold][0]], y[folds[fold][1]], target_scoring,
+                                       round_resource, resource, random_state)
+                for candidate, fold in tasks)
+            scores = np.full((len(pool), len(folds)), np.NaN)
+            for (candidate, fold), (score, seconds) in zip(tasks, outputs):
+                name, params, estimator = pool[candidate]
+                scores[candidate, fold] = score
+                cpu_seconds += seconds
+                round_seconds += seconds
+                rows.append([target_name, name, str(params), round_number, round_resource,
+                             fold, score, seconds])
+
+            # Best mean scores first, candidates failing on every fold last
+            counts = (~np.isnan(scores)).sum(axis=1)
+            means = np.where(counts > 0, np.nansum(scores, axis=1) / np.maximum(counts, 1), -np.inf)
+            order = np.argsort(-means, kind='stable')
+            pool = [pool[i] for i in order]
+
+    return pd.DataFrame(rows, columns=['Target', 'Model', 'Params', 'Round', 'Resource',
+                                       'Fold', 'Score', 'CPU Seconds'])
+
+def best_candidates(results):
+    """
+    This function returns the candidates of the last round each target
+    reached, best first, with their mean and standard deviation of fold scores.
+    :param results: (DataFrame) results of halving_search()
+    """
+    last = results.groupby('Target')['Round'].transform('max')
+    final = results[results['Round'] == last]
+    grouped = final.groupby(['Target', 'Model', 'Params', 'Round', 'Resource'], sort=False)['Score']
+    summary = pd.DataFrame({'Mean Score': grouped.mean(),
+                            'Std Score': grouped.std(ddof=0)
+                           }).reset_index()
+    return summary.sort_values(['Target', 'Mean Score'], ascending=[True, False]).reset_index(drop=True)
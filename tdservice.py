@@ -0,0 +1,313 @@
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
+import os
+import pandas as pd
+from tdscraper import DriverSupervisor, get_keys, scrape_watchlist
+import threading
+import time
+
+MARKET_TZ = 'America/New_York'
+MARKET_OPEN = '09:30'
+MARKET_CLOSE = '16:00'
+
+# Quote fields move during the session, the other tabs change at most daily
+QUOTE_TABS = ['summary']
+SLOW_TABS = ['earnings', 'fundies', 'valuation', 'analysts']
+
+def market_now():
+    """
+    This function returns the current time in the market's time zone.
+    """
+    return pd.Timestamp.now(tz=MARKET_TZ)
+
+def is_trading_day(day, holidays=()):
+    """
+    This function checks whether the market trades on a day.
+    :param day: (Timestamp) day to check
+    :param holidays: (list-like) dates the market is closed on weekdays
+    """
+    return day.weekday() < 5 and day.strftime('%Y-%m-%d') not in holidays
+
+def market_is_open(now, holidays=()):
+    """
+    This function checks whether the market is open at a time.
+    :param now: (Timestamp) time in the market's time zone
+    :param holidays: (list-like) dates the market is closed on weekdays
+    """
+    return (is_trading_day(now, holidays) and
+            MARKET_OPEN <= now.strftime('%H:%M') < MARKET_CLOSE)
+
+def last_session(now, holidays=()):
+    """
+    This function returns the date of the last trading session that has
+    closed at a time, which is the date an off-hours snapshot is named after.
+    A scrape started on Saturday, or running past midnight, belongs to the
+    session of the last close.
+    :param now: (Timestamp) time in the market's time zone
+    :param holidays: (list-like) dates the market is closed on weekdays
+    """
+    day = now.normalize()
+    if not (is_trading_day(day, holidays) and now.strftime('%H:%M') >= MARKET_CLOSE):
+        day -= pd.Timedelta('1D')
+        while not is_trading_day(day, holidays):
+            day -= pd.Timedelta('1D')
+    return day
+
+def next_change(now, holidays=()):
+    """
+    This function returns the next market open or close after a time.
+    :param now: (Timestamp) time in the market's time zone
+    :param holidays: (list-like) dates the market is closed on weekdays
+    """
+    day = now.normalize()
+    while True:
+        if is_trading_day(day, holidays):
+            for hour in [MARKET_OPEN, MARKET_CLOSE]:
+                change = day + pd.Timedelta(hour + ':00')
+                if change > now:
+                    return change
+        day += pd.Timedelta('1D')
+
+class ScrapeJob:
+    """
+    A watchlist refresh run by ScrapeService once per trading session, either
+    while the market is open or while it is closed.
+    :param name: (str) snapshot name, the session date is appended to it
+    :param tabs: (list) tabs to scrape out of TAB_NAMES
+    :param hours: (str) 'market' to run during market hours, or 'off' to run
+                        after the close, overnight and on weekends
+    :param kwargs: keyword arguments passed on to scrape_watchlist()
+    """
+    def __init__(self, name, tabs, hours, **kwargs):
+        if hours not in ['market', 'off']:
+            raise ValueError("hours must be 'market' or 'off'")
+        self.name = name
+        self.tabs = tabs
+        self.hours = hours
+        self.kwargs = kwargs
+
+    def __repr__(self):
+        return "ScrapeJob('{}', {}, '{}')".format(self.name, self.tabs, self.hours)
+
+    def session(self, now, holidays=()):
+        """
+        This function returns the session date the job would run for at a time,
+        or None if the job is outside of its hours.
+        :param now: (Timestamp) time in the market's time zone
+        :param holidays: (list-like) dates the market is closed on weekdays
+        """
+        if market_is_open(now, holidays):
+            return now.normalize() if self.hours == 'market' else None
+        return last_session(now, holidays) if self.hours == 'off' else None
+
+def default_jobs(name):
+    """
+    This function returns the usual jobs of a watchlist: the quote tab during
+    market hours, saved as <name>_quotes, and a full snapshot with closing
+    quotes and the slow-changing tabs off hours, saved as <name>.
+    :param name: (str) name of the watchlist
+    """
+    return [ScrapeJob(name + '_quotes', QUOTE_TABS, 'market'),
+            ScrapeJob(name, QUOTE_TABS + SLOW_TABS, 'off')]
+
+class ScrapeService:
+    """
+    Long-running scraper that refreshes a watchlist unattended. Each job runs
+    once per trading session within its hours, and is resumed where it
+    stopped if the service is restarted, since scrape_watchlist() skips
+    finished tickers and the snapshot is named after the session date instead
+    of the day the run started. The logged in driver is kept under a
+    DriverSupervisor and refreshed while idle so it is warm when a job starts.
+    Progress and health are written to a status .json file, and served as
+    json on a local port if one is given.
+    :param keys: (dict) dictionary with username ("user") and password ("pass")
+    :param tickers: (list) ticker symbols of the watchlist
+    :param jobs: (list) ScrapeJob objects, such as default_jobs(name)
+    :param root_dir: (str) directory to save the snapshots to
+    :param status_path: (str) .json file the status is written to, and the
+                              finished sessions are restored from
+    :param port: (int) serve the status on http://localhost:port, or not if None
+    :param holidays: (list-like) dates the market is closed on weekdays, as 'YYYY-MM-DD'
+    :param idle_refresh: (float) minutes between page refreshes of an idle driver
+    :param poll: (float) most minutes to sleep between checks for due jobs
+    :param kwargs: keyword arguments passed on to DriverSupervisor
+    """
+    def __init__(self, keys, tickers, jobs, root_dir='', status_path='scrape_status.json',
+                 port=None, holidays=(), idle_refresh=10, poll=5, **kwargs):
+        self.keys = keys
+        self.tickers = list(tickers)
+        self.jobs = jobs
+        self.root_dir = root_dir
+        self.status_path = status_path
+        self.holidays = set(holidays)
+        self.idle_refresh = idle_refresh
+        self.poll = poll
+        self.supervisor_kwargs = kwargs
+        self.supervisor = None
+        self.finished = {}
+        if os.path.isfile(status_path):
+            with open(status_path) as f:
+                self.finished = json.load(f).get('finished', {})
+        self.status = {'state': 'starting',
+                       'started': str(market_now()),
+                       'job': None,
+                       'session': None,
+                       'tickers_done': 0,
+                       'n_tickers': len(self.tickers),
+                       'ticker': None,
+                       'restarts': 0,
+                       'errors': 0,
+                       'last_error': None,
+                       'finished': self.finished
+                      }
+        self._lock = threading.Lock()
+        self._last_refresh = time.time()
+        self.server = None
+        if port is not None:
+            self.server = HTTPServer(('localhost', port), self._handler())
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def _handler(self):
+        """
+        This function returns the request handler serving the status.
+        """
+        service = self
+
+        class StatusHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with service._lock:
+                    body = json.dumps(service.status, default=str).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return StatusHandler
+
+    def update(self, tickers_done=None, n_tickers=None, ticker=None, **status):
+        """
+        This function updates the status and writes it to the status file. It is
+        passed to scrape_watchlist() as the progress callback.
+        :param tickers_done: (int) tickers of the job done so far
+        :param n_tickers: (int) tickers of the job
+        :param ticker: (str) last ticker done
+        :param status: other status fields to set, such as the tickers_scraped,
+                       tickers_skipped and tickers_failed counts
+        """
+        with self._lock:
+            if tickers_done is not None:
+                status.update({'tickers_done': tickers_done, 'n_tickers': n_tickers, 'ticker': ticker})
+            self.status.update(status)
+            self.status['heartbeat'] = str(market_now())
+            if self.supervisor is not None:
+                self.status['restarts'] = self.supervisor.restarts
+            # Write then rename so readers never see a partial file
+            with open(self.status_path + '.tmp', 'w') as f:
+                json.dump(self.status, f, default=str, indent=1)
+            os.replace(self.status_path + '.tmp', self.status_path)
+
+    def due(self, now):
+        """
+        This function returns the first job due at a time with its session date,
+        or (None, None) if every job is done or outside of its hours.
+        :param now: (Timestamp) time in the market's time zone
+        """
+        for job in self.jobs:
+            session = job.session(now, self.holidays)
+            if session is not None and self.finished.get(job.name) != session.strftime('%Y-%m-%d'):
+                return job, session
+        return None, None
+
+    def keep_warm(self):
+        """
+        This function starts the driver if needed, and refreshes the page of an
+        idle driver so its login session does not expire. A driver that does
+        not respond is restarted.
+        """
+        if self.supervisor is None:
+            self.supervisor = DriverSupervisor(self.keys, **self.supervisor_kwargs)
+            self._last_refresh = time.time()
+        if time.time() - self._last_refresh < 60 * self.idle_refresh:
+            return
+        try:
+            self.supervisor.driver.refresh()
+        except:
+            self.supervisor.restart('idle')
+        self._last_refresh = time.time()
+
+    def run_job(self, job, session):
+        """
+        This function scrapes the watchlist for a job and session, and records
+        the session as finished.
+        :param job: (ScrapeJob) job to run
+        :param session: (Timestamp) session date the snapshot is named after
+        """
+        print("Running {} for {}".format(job.name, session.date()))
+        self.update(state='scraping', job=job.name, session=session.strftime('%Y-%m-%d'),
+                    tickers_done=0, n_tickers=len(self.tickers), ticker=None,
+                    tickers_scraped=0, tickers_skipped=0, tickers_failed=0)
+        scrape_watchlist(self.supervisor.driver, self.tickers, job.name, root_dir=self.root_dir,
+                         supervisor=self.supervisor, tabs=job.tabs, date=session,
+                         progress=self.update, **job.kwargs)
+        self.finished[job.name] = session.strftime('%Y-%m-%d')
+        self._last_refresh = time.time()
+        self.update(state='idle', job=None, finished=self.finished)
+
+    def run(self, until=None):
+        """
+        This function runs due jobs until stopped with KeyboardInterrupt, or
+        until a time. A failed job is logged in the status and tried again at
+        the next check.
+        :param until: (Timestamp) time in the market's time zone to stop at
+        """
+        try:
+            while until is None or market_now() < until:
+                now = market_now()
+                job, session = self.due(now)
+                if job is None:
+                    wake = min(next_change(now, self.holidays), now + pd.Timedelta(minutes=self.poll))
+                    self.update(state='idle', next_check=str(wake))
+                    self.keep_warm()
+                    time.sleep(max((wake - market_now()).total_seconds(), 1))
+                    continue
+                try:
+                    self.keep_warm()
+                    self.run_job(job, session)
+                except KeyboardInterrupt:
+                    raise
+                except Exception as e:
+                    print("{} failed: {!r}".format(job.name, e))
+                    self.update(state='error', errors=self.status['errors'] + 1, last_error=repr(e))
+                    time.sleep(60 * self.poll)
+        except KeyboardInterrupt:
+            print("Stopping scrape service")
+        finally:
+            self.update(state='stopped')
+            if self.server is not None:
+                self.server.shutdown()
+            if self.supervisor is not None:
+                try:
+                    self.supervisor.driver.quit()
+                except:
+                    pass
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Refresh a watchlist unattended around market hours')
+    parser.add_argument('keys', help='.json file with "user" and "pass"')
+    parser.add_argument('tickers', help='.csv file of tickers')
+    parser.add_argument('name', help='name of the watchlist, such as nmr_us')
+    parser.add_argument('--column', default='yahoo', help='ticker column of the .csv file')
+    parser.add_argument('--root_dir', default='', help='directory to save the snapshots to')
+    parser.add_argument('--status', default='scrape_status.json', help='status .json file')
+    parser.add_argument('--port', type=int, default=None, help='local port to serve the status on')
+    args = parser.parse_args()
+
+    tickers = pd.read_csv(args.tickers)[args.column].dropna()
+    service = ScrapeService(get_keys(args.keys), tickers, default_jobs(args.name),
+                            root_dir=args.root_dir, status_path=args.status, port=args.port)
+    service.run()
@@ -0,0 +1,174 @@
+from collections import OrderedDict
+import os
+import pandas as pd
+from tddata import combined_dtypes, list_tickers, read_combined, snapshot_date
+
+class Snapshot:
+    """
+    Handle on a previously scraped watchlist database. Tickers and tables are
+    listed from the directory tree without reading any file, and table files
+    are only read for the tickers a query asks for. Read files are kept in a
+    bounded least recently used cache.
+    :param database_path: (str) The location of the database
+    :param cache_size: (int) number of (table, ticker) files kept in memory
+    """
+    def __init__(self, database_path, cache_size=4096):
+        self.database_path = database_path
+        self.cache_size = cache_size
+        self.date = snapshot_date(database_path)
+        self._cache = OrderedDict()
+        self._tickers = None
+        self._tables = None
+
+    def __repr__(self):
+        return "Snapshot('{}')".format(self.database_path)
+
+    @property
+    def tickers(self):
+        """
+        This function lists the tickers of the snapshot.
+        """
+        if self._tickers is None:
+            self._tickers = list_tickers(self.database_path)
+        return self._tickers
+
+    @property
+    def tables(self):
+        """
+        This function lists the tables scraped for at least one ticker, such as
+        'combined', 'summary' or 'fundies_yearly'.
+        """
+        if self._tables is None:
+            tables = set()
+            for ticker in self.tickers:
+                tables.update(name[:-4] for name in os.listdir(os.path.join(self.database_path, ticker))
+                              if name.endswith('.csv'))
+            self._tables = sorted(tables)
+        return self._tables
+
+    def _cached(self, table, ticker, reader):
+        """
+        This function returns a file from the cache, reading it on a miss and
+        evicting the least recently used file when the cache is full.
+        """
+        key = (table, ticker)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        value = reader()
+        self._cache[key] = value
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return value
+
+    def read(self, ticker, table):
+        """
+        This function returns one table of one ticker, as saved by scrape_watchlist().
+        :param ticker: (str) ticker symbol
+        :param table: (str) table name, such as 'earnings_yearly'
+        """
+        file_path = os.path.join(self.database_path, ticker, '{}.csv'.format(table))
+        return self._cached(table, ticker, lambda: pd.read_csv(file_path, index_col=0)).copy()
+
+    def table(self, table, tickers=None):
+        """
+        This function returns one table for several tickers, as a dict of
+        dataframes by ticker. Tickers without the table are left out.
+        :param table: (str) table name, such as 'earnings_yearly'
+        :param tickers: (list-like) The securities to be gathered, all if None
+        """
+        if tickers is None:
+            tickers = self.tickers
+        return {ticker: self.read(ticker, table) for ticker in tickers
+                if os.path.isfile(os.path.join(self.database_path, ticker, '{}.csv'.format(table)))}
+
+    def load_combined(self, tickers=None, columns=None):
+        """
+        This function returns the combined rows of some tickers, converted like
+        build_big_df() does.
+        :param tickers: (list-like) The securities to be gathered, all if None
+        :param columns: (list) columns to return, all if None
+        """
+        if tickers is None:
+            tickers = self.tickers
+        elif isinstance(tickers, str):
+            tickers = [tickers]
+        rows = [self._cached('combined', ticker, lambda: read_combined(ticker, self.database_path))
+                for ticker in tickers]
+        big_df = pd.concat(rows, axis=0, sort=True) if rows else pd.DataFrame()
+        if columns is not None:
+            big_df = big_df.reindex(columns=columns)
+        return combined_dtypes(big_df)
+
+    @property
+    def combined(self):
+        """
+        This function returns a lazy view of the combined df. Selecting columns
+        with [] and tickers with .loc[] reads only those tickers' files, as in
+        snap.combined[['Beta', 'Market Cap']].loc[tickers].
+        """
+        return CombinedView(self)
+
+class CombinedView:
+    """
+    Lazy view of the combined df of a Snapshot. Nothing is read until tickers
+    are selected with .loc[], or the whole view is loaded with load().
+    :param snapshot: (Snapshot) snapshot the view reads from
+    :param columns: (list) columns of the view, all if None
+    """
+    def __init__(self, snapshot, columns=None):
+        self.snapshot = snapshot
+        self.columns = columns
+
+    def __repr__(self):
+        return 'CombinedView({}, columns={})'.format(self.snapshot, self.columns)
+
+    def __getitem__(self, columns):
+        if isinstance(columns, str):
+            return self.loc[:, columns]
+        return CombinedView(self.snapshot, list(columns))
+
+    def __len__(self):
+        return len(self.snapshot.tickers)
+
+    @property
+    def index(self):
+        return pd.Index(self.snapshot.tickers)
+
+    @property
+    def loc(self):
+        return _CombinedLoc(self)
+
+    def load(self):
+        """
+        This function reads the view for every ticker.
+        """
+        return self.snapshot.load_combined(columns=self.columns)
+
+class _CombinedLoc:
+    """
+    .loc[] indexer of a CombinedView, taking tickers and optionally columns.
+    """
+    def __init__(self, view):
+        self.view = view
+
+    def __getitem__(self, key):
+        rows, columns = key if isinstance(key, tuple) else (key, None)
+        if isinstance(rows, slice) and rows == slice(None):
+            rows = None
+        elif isinstance(rows, slice):
+            raise ValueError("Select tickers with a label or a list of labels")
+        single_row = isinstance(rows, str)
+        single_column = isinstance(columns, str)
+        if columns is None:
+            columns = self.view.columns
+        elif single_column:
+            columns = [columns]
+        df = self.view.snapshot.load_combined(rows, columns)
+        if single_row and single_column:
+            return df.iloc[0, 0]
+        if single_row:
+            return df.iloc[0]
+        if single_column:
+            return df.iloc[:, 0]
+        return df
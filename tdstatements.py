@@ -0,0 +1,232 @@
+import numpy as np
+import os
+import pandas as pd
+from tddata import list_tickers, snapshot_date
+
+STORE_COLUMNS = ['Snapshot', 'Ticker', 'Report', 'Line Item', 'Period', 'Period End', 'Value']
+
+def load_statements(database_path, tickers=None):
+    """
+    This function reads the Balance Sheet, Income Statement and Cash Flow rows of
+    the 'fundies_yearly.csv' files of a previously scraped watchlist database
+    into long format, one row per (snapshot, ticker, report, line item, period)
+    with a value. The 'Date' row of each report gives the 'Period End' column.
+    :param database_path: (str) The location of the database
+    :param tickers: (list-like) The securities to be gathered, all if None
+    """
+    if tickers is None:
+        tickers = list_tickers(database_path)
+    snapshot = snapshot_date(database_path)
+    frames = []
+    date_frames = []
+    for ticker in tickers:
+        file_path = database_path+'/{}/fundies_yearly.csv'.format(ticker)
+        if not os.path.isfile(file_path):
+            continue
+        temp = pd.read_csv(file_path, index_col=0)
+        if 'Report' not in temp.columns:
+            continue
+        # Rows without a report are the price history and derived rows
+        temp = temp[temp['Report'].notnull()]
+        if temp.empty:
+            continue
+        report = temp.pop('Report').to_numpy(dtype=object)
+        periods = np.asarray(temp.columns, dtype=object)
+        is_date = (temp.index == 'Date')
+
+        # Period end dates of each report
+        dates = temp[is_date]
+        n_rows, n_periods = dates.shape
+        date_frames.append(pd.DataFrame({'Ticker': ticker,
+                                         'Report': np.tile(report[is_date], n_periods),
+                                         'Period': np.repeat(periods, n_rows),
+                                         'Period End': dates.to_numpy(dtype=object).T.ravel()
+                                        }))
+
+        # Statement values
+        values = temp[~is_date]
+        n_rows, n_periods = values.shape
+        numbers = values.apply(pd.to_numeric, errors='coerce').to_numpy(dtype='float64').T.ravel()
+        frame = pd.DataFrame({'Ticker': ticker,
+                              'Report': np.tile(report[~is_date], n_periods),
+                              'Line Item': np.tile(values.index.to_numpy(dtype=object), n_periods),
+                              'Period': np.repeat(periods, n_rows),
+                              'Value': numbers
+                             })
+        frames.append(frame[~np.isnan(numbers)])
+
+    if not frames:
+        return pd.DataFrame(columns=STORE_COLUMNS)
+    data = pd.concat(frames, axis=0, ignore_index=True)
+    dates = pd.concat(date_frames, axis=0, ignore_index=True).dropna(subset=['Period End'])
+    dates = dates.drop_duplicates(['Ticker', 'Report', 'Period'])
+    dates['Period End'] = pd.to_datetime(dates['Period End'])
+    data = data.merge(dates, on=['Ticker', 'Report', 'Period'], how='left')
+    data['Snapshot'] = pd.Timestamp(snapshot)
+    return data[STORE_COLUMNS]
+
+class StatementStore:
+    """
+    Long format store of the financial statements of one or more snapshots, one
+    row per (snapshot, ticker, report, line item, period). Rows are located
+    through precomputed positions by line item and by ticker, so cross-sectional
+    and time series slices of the full universe take milliseconds.
+    :param data: (DataFrame) rows with the STORE_COLUMNS, as returned by
+                             load_statements()
+    """
+    def __init__(self, data=None):
+        if data is None:
+            data = pd.DataFrame(columns=STORE_COLUMNS)
+        self.data = data[STORE_COLUMNS].reset_index(drop=True)
+        self._build_index()
+
+    def _build_index(self):
+        """
+        This function stores categorical columns and the row positions of each
+        line item and ticker.
+        """
+        for col in ['Ticker', 'Report', 'Line Item', 'Period']:
+            self.data[col] = self.data[col].astype('category')
+        self.data['Snapshot'] = pd.to_datetime(self.data['Snapshot'])
+        self.data['Value'] = self.data['Value'].astype('float64')
+        self._by_item = self.data.groupby('Line Item', observed=True).indices
+        self._by_ticker = self.data.groupby('Ticker', observed=True).indices
+        self.snapshots = sorted(pd.to_datetime(self.data['Snapshot'].unique()))
+
+    @classmethod
+    def from_snapshots(cls, database_paths, tickers=None):
+        """
+        This function builds a store from previously scraped watchlist databases.
+        :param database_paths: (list) locations of the databases
+        :param tickers: (list-like) The securities to be gathered, all if None
+        """
+        frames = [load_statements(path, tickers) for path in database_paths]
+        return cls(pd.concat(frames, axis=0, ignore_index=True) if frames else None)
+
+    @classmethod
+    def load(cls, path):
+        """
+        This function loads a store saved with save().
+        :param path: (str) file the store was saved to
+        """
+        return cls(pd.read_pickle(path))
+
+    def save(self, path):
+        """
+        This function saves the store to a pickle file.
+        :param path: (str) file to save the store to
+        """
+        self.data.to_pickle(path)
+
+    def add_snapshot(self, database_path, tickers=None):
+        """
+        This function adds a watchlist database to the store, replacing the rows
+        of a snapshot with the same date.
+        :param database_path: (str) The location of the database
+        :param tickers: (list-like) The securities to be gathered, all if None
+        """
+        new = load_statements(database_path, tickers)
+        old = self.data[self.data['Snapshot'] != pd.Timestamp(snapshot_date(database_path))].copy()
+        for col in ['Ticker', 'Report', 'Line Item', 'Period']:
+            old[col] = old[col].astype(object)
+        self.data = pd.concat([old, new], axis=0, ignore_index=True)
+        self._build_index()
+
+    def _resolve_snapshot(self, snapshot):
+        """
+        This function turns the snapshot argument of the queries into a list of
+        snapshot dates, or None for all of them.
+        """
+        if snapshot is None:
+            return None
+        if isinstance(snapshot, str) and snapshot == 'latest':
+            return self.snapshots[-1:]
+        if isinstance(snapshot, (list, tuple, pd.Index, np.ndarray)):
+            return [pd.Timestamp(x) for x in snapshot]
+        return [pd.Timestamp(snapshot)]
+
+    def query(self, ticker=None, report=None, line_item=None, period=None, snapshot='latest'):
+        """
+        This function returns the long format rows matching every given filter.
+        Each filter can be a single value or a list, and None matches everything.
+        :param ticker: (str or list) ticker symbols
+        :param report: (str or list) 'Balance Sheet', 'Income Statement' or 'Cash Flow'
+        :param line_item: (str or list) line items, such as 'Total Cash from Operations'
+        :param period: (str or list) period column names, such as 'Q3 2022' or 'Q4 2022'
+        :param snapshot: (str, datetime or list) snapshot dates, 'latest' for the
+                                                 most recent snapshot or None for all
+        """
+        def as_list(x):
+            return [x] if isinstance(x, str) or not hasattr(x, '__iter__') else list(x)
+
+        # Narrow down to the rows of the line items and/or tickers first
+        positions = None
+        for values, lookup in [(line_item, self._by_item), (ticker, self._by_ticker)]:
+            if values is None:
+                continue
+            found = [lookup[x] for x in as_list(values) if x in lookup]
+            found = np.concatenate(found) if found else np.array([], dtype=int)
+            positions = found if positions is None else np.intersect1d(positions, found)
+        rows = self.data if positions is None else self.data.iloc[np.sort(positions)]
+
+        # Filter the remaining keys
+        mask = np.ones(len(rows), dtype=bool)
+        for col, values in [('Report', report), ('Period', period)]:
+            if values is not None:
+                mask &= rows[col].isin(as_list(values)).to_numpy()
+        snapshots = self._resolve_snapshot(snapshot)
+        if snapshots is not None:
+            mask &= rows['Snapshot'].isin(snapshots).to_numpy()
+        return rows[mask]
+
+    def cross_section(self, line_item, period, report=None, snapshot='latest'):
+        """
+        This function returns one line item for one period across every ticker,
+        such as 'Total Cash from Operations' for 'Q3 2022'.
+        :param line_item: (str) line item
+        :param period: (str) period column name
+        :param report: (str) report of the line item, if it is in several
+        :param snapshot: (str or datetime) snapshot date or 'latest'
+        """
+        rows = self.query(report=report, line_item=line_item, period=period, snapshot=snapshot)
+        rows = rows.drop_duplicates('Ticker', keep='last')
+        return pd.Series(rows['Value'].to_numpy(), index=rows['Ticker'].astype(object).to_numpy(), name=line_item)
+
+    def time_series(self, ticker, line_item, report=None, snapshot='latest'):
+        """
+        This function returns one line item of one ticker over its periods, in
+        order of period end. With snapshot=None a column is returned for every
+        snapshot, showing how the reported values changed between snapshots.
+        :param ticker: (str) ticker symbol
+        :param line_item: (str) line item
+        :param report: (str) report of the line item, if it is in several
+        :param snapshot: (str or datetime) snapshot date, 'latest' or None for all
+        """
+        rows = self.query(ticker=ticker, report=report, line_item=line_item, snapshot=snapshot)
+        rows = rows.sort_values(['Period End', 'Snapshot'], kind='mergesort')
+        if snapshot is None:
+            series = rows.pivot_table(index='Period', columns='Snapshot', values='Value',
+                                      aggfunc='last', observed=True, sort=False)
+            return series
+        rows = rows.drop_duplicates('Period', keep='last')
+        return pd.Series(rows['Value'].to_numpy(), index=rows['Period'].astype(object).to_numpy(), name=line_item)
+
+    def panel(self, line_item, report=None, snapshot='latest'):
+        """
+        This function returns one line item for every ticker and period, as a
+        tickers x periods dataframe.
+        :param line_item: (str) line item
+        :param report: (str) report of the line item, if it is in several
+        :param snapshot: (str or datetime) snapshot date or 'latest'
+        """
+        rows = self.query(report=report, line_item=line_item, snapshot=snapshot)
+        return rows.pivot_table(index='Ticker', columns='Period', values='Value',
+                                aggfunc='last', observed=True)
+
+    def line_items(self, report=None):
+        """
+        This function lists the line items in the store.
+        :param report: (str) only list the line items of this report
+        """
+        data = self.data if report is None else self.data[self.data['Report'] == report]
+        return sorted(data['Line Item'].astype(object).unique())
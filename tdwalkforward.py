@@ -0,0 +1,144 @@
+from joblib import Parallel, delayed
+import numpy as np
+import pandas as pd
+from sklearn.base import clone, is_classifier
+from sklearn.metrics import get_scorer
+from tdimpute import estimator_name
+import time
+
+def walk_forward_splits(dates, min_train_periods=1, train_periods=None, gap=0):
+    """
+    This function returns the walk-forward (train dates, test date) splits of
+    a sorted list of snapshot dates: every date after the first
+    min_train_periods + gap dates is a test date, trained on the dates before
+    it, leaving out the gap dates just before it.
+    :param dates: (list) sorted snapshot dates
+    :param min_train_periods: (int) fewest training dates of a split
+    :param train_periods: (int) most training dates of a split, expanding
+                                windows if None
+    :param gap: (int) dates left out between training and test, such as the
+                      snapshots a return horizon overlaps
+    """
+    splits = []
+    for i in range(min_train_periods + gap, len(dates)):
+        train = dates[:i - gap]
+        if train_periods is not None:
+            train = train[-train_periods:]
+        splits.append((list(train), dates[i]))
+    return splits
+
+def date_matrices(X, y, prepare=None):
+    """
+    This function splits a stacked feature matrix and target into one
+    (features, target) array pair per snapshot date, leaving out rows without
+    a target. Each date is prepared once and shared by every split.
+    :param X: (DataFrame) features indexed by (snapshot date, ticker)
+    :param y: (Series) target with the same index
+    :param prepare: (function) applied to each date's feature dataframe first,
+                               such as a cross-sectional rank transform
+    """
+    y = y.reindex(X.index)
+    matrices = {}
+    for date, rows in X.groupby(level=0, sort=True).indices.items():
+        features = X.iloc[rows]
+        if prepare is not None:
+            features = prepare(features)
+        target = y.iloc[rows].to_numpy()
+        keep = ~pd.isnull(target)
+        matrices[date] = (np.asfortranarray(features.to_numpy(dtype='float64')[keep]), target[keep])
+    return matrices
+
+def run_split(estimator, train_matrices, test_matrix, scoring):
+    """
+    This function fits an estimator on the training dates and scores it on the
+    test date. Returns the scores by scorer name and the seconds it took.
+    :param estimator: (estimator) unfitted model or pipeline
+    :param train_matrices: (list) (features, target) pairs of the training dates
+    :param test_matrix: (tuple) (features, target) pair of the test date
+    :param scoring: (list) scikit-learn scorer names
+    """
+    start = time.time()
+    X_train = np.concatenate([features for features, target in train_matrices])
+    y_train = np.concatenate([target for features, target in train_matrices])
+    X_test, y_test = test_matrix
+    model = clone(estimator).fit(X_train, y_train)
+    scores = {}
+    for name in scoring:
+        try:
+            scores[name] = get_scorer(name)(model, X_test, y_test)
+        except ValueError:
+            # Such as roc_auc on a test date with one class
+            scores[name] = np.NaN
+    return scores, time.time() - start
+
+def walk_forward(X, y, estimators, scoring=None, min_train_periods=1, train_periods=None,
+                 gap=0, prepare=None, n_jobs=-1):
+    """
+    This function evaluates estimators walk-forward across stacked snapshots:
+    each snapshot date is scored by models trained on the earlier dates only.
+    Every (estimator, split) runs in parallel. Returns a tidy dataframe with
+    one row per estimator and test date.
+    :param X: (DataFrame) features indexed by (snapshot date, ticker)
+    :param y: (Series) target with the same index, such as a make_targets() column
+    :param estimators: (list or dict) models or pipelines, by name if a dict
+    :param scoring: (list) scikit-learn scorer names, ['roc_auc', 'accuracy'] for
+                           classifiers and ['r2'] otherwise if None
+    :param min_train_periods: (int) fewest training dates of a split
+    :param train_periods: (int) most training dates of a split, expanding
+                                windows if None
+    :param gap: (int) dates left out between training and test
+    :param prepare: (function) applied to each date's feature dataframe, see
+                               date_matrices()
+    :param n_jobs: (int) number of processes, -1 for every CPU
+    """
+    if not isinstance(estimators, dict):
+        estimators = {estimator_name(estimator): estimator for estimator in estimators}
+    matrices = date_matrices(X, y, prepare)
+    splits = walk_forward_splits(sorted(matrices), min_train_periods, train_periods, gap)
+    if not splits:
+        raise ValueError("Not enough snapshot dates for a walk-forward split")
+
+    tasks = []
+    for name, estimator in estimators.items():
+        if scoring is not None:
+            names = list(scoring)
+        elif is_classifier(estimator):
+            names = ['roc_auc', 'accuracy']
+        else:
+            names = ['r2']
+        for train, test in splits:
+            tasks.append((name, estimator, train, test, names))
+    print('Running {} splits of {} estimators'.format(len(splits), len(estimators)))
+    outputs = Parallel(n_jobs=n_jobs)(delayed(run_split)(estimator, [matrices[date] for date in train],
+                                                         matrices[test], names)
+                                      for name, estimator, train, test, names in tasks)
+
+    rows = []
+    for (name, estimator, train, test, names), (scores, seconds) in zip(tasks, outputs):
+        row = {'Estimator': name,
+               'Test Date': test,
+               'Train Start': train[0],
+               'Train End': train[-1],
+               'N Train': sum(len(matrices[date][1]) for date in train),
+               'N Test': len(matrices[test][1])
+              }
+        row.update(scores)
+        row['Seconds'] = seconds
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+def summarize_walk_forward(results):
+    """
+    This function returns the mean, standard deviation and worst test date of
+    each metric for each estimator.
+    :param results: (DataFrame) results of walk_forward()
+    """
+    metrics = [col for col in results.columns if col not in
+               ['Estimator', 'Test Date', 'Train Start', 'Train End', 'N Train', 'N Test', 'Seconds']]
+    grouped = results.groupby('Estimator', sort=False)[metrics]
+    summary = pd.concat({'Mean': grouped.mean(),
+                         'Std': grouped.std(),
+                         'Min': grouped.min()
+                        }, axis=1)
+    summary.columns = ['{} {}'.format(metric, stat) for stat, metric in summary.columns]
+    return summary
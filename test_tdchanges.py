@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+from tdchanges import apply_changes, changed_tickers, frame_changes, removed_tickers
+
+def make_frames():
+    """
+    This function returns a previous and a new combined df where ticker 'B' is
+    in both but has no value in the previous one, 'C' leaves with no value and
+    'E' joins with no value.
+    """
+    old = pd.DataFrame({'Price': [1.0, np.NaN, np.NaN, 4.0],
+                        'Volume': [10.0, np.NaN, np.NaN, 40.0]},
+                       index=['A', 'B', 'C', 'D'])
+    new = pd.DataFrame({'Price': [1.5, 2.0, 4.0, np.NaN],
+                        'Volume': [10.0, np.NaN, 40.0, np.NaN]},
+                       index=['A', 'B', 'D', 'E'])
+    return old, new
+
+def test_all_nan_rows_are_labelled_by_index():
+    old, new = make_frames()
+    changes = frame_changes(old, new)
+    kinds = changes.groupby('Ticker', observed=True)['Kind'].agg(lambda x: sorted(set(x)))
+    assert kinds['B'] == ['changed']
+    assert kinds['C'] == ['removed']
+    assert kinds['E'] == ['added']
+    assert 'D' not in kinds.index
+    assert removed_tickers(changes) == ['C']
+    assert changed_tickers(changes) == ['A', 'B', 'E']
+
+def test_apply_changes_with_all_nan_rows():
+    old, new = make_frames()
+    rebuilt = apply_changes(old, frame_changes(old, new))
+    pd.testing.assert_frame_equal(rebuilt.loc[new.index], new)
+    assert sorted(rebuilt.index) == sorted(new.index)
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+from tdindustry import peer_median_ratio, peer_rank, ratio_to_industry, split_valuations
+
+METRICS = [('Price/Sales (TTM)', 'Valuation', 2.5),
+           ('Price/Book (MRQ)', 'Valuation', 3.1),
+           ('Gross Profit Margin (TTM)', 'Profitability', 0.42),
+           ('Return On Equity (TTM)', 'Management Effectiveness', 0.15),
+           ('Annual Dividend Yield', 'Dividend', 0.021),
+           ('Dividend Change %', 'Dividend', 0.05)]
+
+def valuation_table(ticker, own, metrics=METRICS, offset=0.0):
+    """
+    This function returns a valuation table shaped like scrape_valuation()'s.
+    :param ticker: (str) ticker symbol
+    :param own: (list) the ticker's own values, one per metric
+    :param metrics: (list) (metric, type, industry value) tuples
+    :param offset: (float) added to every industry value, to make another industry
+    """
+    df = pd.DataFrame({'Type': [kind for metric, kind, industry in metrics],
+                       ticker: own,
+                       'Industry': [industry + offset for metric, kind, industry in metrics]},
+                      index=[metric for metric, kind, industry in metrics])
+    df['Ratio to Industry'] = df[ticker] / df['Industry']
+    return df
+
+def make_valuations():
+    """
+    This function returns the valuation tables of three tickers of one
+    industry, 'C' without the dividend rows, and one ticker of another industry.
+    """
+    return {'A': valuation_table('A', [1.0, 2.0, 0.3, 0.1, 0.01, 0.02]),
+            'B': valuation_table('B', [3.0, 4.0, 0.5, 0.2, 0.03, 0.04]),
+            'C': valuation_table('C', [5.0, 6.0, 0.7, 0.3], metrics=METRICS[:4]),
+            'D': valuation_table('D', [7.0, 8.0, 0.9, 0.4, 0.05, 0.06], offset=1.0)}
+
+def test_missing_dividend_rows_join_their_industry():
+    values, benchmarks, members = split_valuations(make_valuations(), '2022-11-27')
+    assert members.loc['C', 'Industry'] == members.loc['A', 'Industry'] == members.loc['B', 'Industry']
+    assert members.loc['D', 'Industry'] != members.loc['A', 'Industry']
+    assert members['Industry'].nunique() == 2
+    assert not benchmarks.index.duplicated().any()
+    assert len(benchmarks) == 2 * len(METRICS)
+
+def test_missing_dividend_rows_are_ranked_among_peers():
+    values, benchmarks, members = split_valuations(make_valuations(), '2022-11-27')
+    ranks = peer_rank(values, members)
+    assert ranks.loc['C', 'Price/Sales (TTM)'] == 1.0
+    assert ranks.loc['A', 'Price/Sales (TTM)'] == 1 / 3
+    assert np.isnan(ranks.loc['C', 'Annual Dividend Yield'])
+    ratios = peer_median_ratio(values, members)
+    assert ratios.loc['C', 'Price/Sales (TTM)'] == 5.0 / 3.0
+    assert ratios.loc['D', 'Price/Sales (TTM)'] == 1.0
+
+def test_ratio_to_industry_matches_the_tab():
+    valuations = make_valuations()
+    values, benchmarks, members = split_valuations(valuations)
+    ratios = ratio_to_industry(values, benchmarks, members)
+    for ticker, df in valuations.items():
+        expected = df['Ratio to Industry'].reindex(ratios.columns)
+        np.testing.assert_allclose(ratios.loc[ticker].to_numpy(), expected.to_numpy())